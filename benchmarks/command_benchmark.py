@@ -0,0 +1,114 @@
+"""Benchmark SOCKET_ON/SOCKET_OFF bursts against an in-process hub."""
+
+import asyncio
+import json
+import time
+
+from elro.api import ATTR_KEY, ATTR_NAME, K1
+from elro.command import SOCKET_OFF, SOCKET_ON
+
+COMMANDS = 5000
+K1_ID = "ST_1234567890ab"
+ANSWER = (
+    b'{"msgId" : 1,"action" : "devSend","params" : {"devTid" : "ST_1234567890ab",'
+    b'"appTid" :  [],"data" : {"cmdId" : 11,"answer_yes_or_no" : 2 }}}\n'
+)
+
+
+class LoopbackTransport:
+    """Transport answering every command without a socket."""
+
+    def __init__(self, protocol) -> None:
+        """Initialize the transport."""
+        self._protocol = protocol
+        self._loop = asyncio.get_running_loop()
+
+    def sendto(self, data, addr=None):
+        """Answer the handshake and the commands."""
+        if data.startswith(b"IOT_KEY?"):
+            reply = f"NAME:{K1_ID}\nKEY:deadbeef012345678deadbeef0123456\n".encode()
+        elif data.startswith(b"{"):
+            reply = ANSWER
+        else:
+            return
+        self._loop.call_soon(self._protocol.datagram_received, reply, addr)
+
+    def close(self):
+        """Close the transport."""
+        self._protocol.connection_lost(None)
+
+
+class LoopbackEndpoint:
+    """Endpoint handing out loopback transports."""
+
+    async def async_create_endpoint(self, protocol_factory, remote_addr, k1_id):
+        """Return a loopback transport and its protocol."""
+        protocol = protocol_factory()
+        transport = LoopbackTransport(protocol)
+        protocol.connection_made(transport)
+        return transport, protocol
+
+
+def legacy_prepare_command(self, attributes, argv):
+    """The original json.dumps command builder, kept for comparison."""
+    self._msg_id += 1
+    command_data = {"cmdId": attributes["cmd_id"].value}
+    command_data.update(attributes["additional_attributes"])
+    command_data.update(argv)
+    command = {
+        "msgId": self._msg_id,
+        "action": "appSend",
+        "params": {
+            "devTid": self._session[ATTR_NAME],
+            "ctrlKey": self._session[ATTR_KEY],
+            "appTid": 1,
+            "data": command_data,
+        },
+    }
+    return json.dumps(command).encode("utf-8")
+
+
+async def async_burst(hub: K1) -> float:
+    """Return the commands per second of a SOCKET_ON/SOCKET_OFF burst."""
+    await hub.async_connect()
+    start = time.perf_counter()
+    for index in range(COMMANDS):
+        await hub.async_process_command(
+            SOCKET_ON if index % 2 else SOCKET_OFF, device_ID=index % 20 + 1
+        )
+    duration = time.perf_counter() - start
+    await hub.async_disconnect()
+    return COMMANDS / duration
+
+
+def build_rate(hub: K1, prepare) -> float:
+    """Return the frames per second of a frame builder."""
+    start = time.perf_counter()
+    for index in range(COMMANDS):
+        prepare(hub, SOCKET_ON if index % 2 else SOCKET_OFF, {"device_ID": index % 20 + 1})
+    return COMMANDS / (time.perf_counter() - start)
+
+
+async def async_main() -> None:
+    """Print the build and end to end rates of both builders."""
+    hub = K1("127.0.0.1", K1_ID, endpoint=LoopbackEndpoint())
+    hub._session = {ATTR_NAME: K1_ID, ATTR_KEY: "deadbeef012345678deadbeef0123456"}
+    legacy_build = build_rate(hub, legacy_prepare_command)
+    template_build = build_rate(hub, K1._prepare_command)
+    print(
+        f"build     legacy={legacy_build:9.0f}/s templates={template_build:9.0f}/s "
+        f"speedup={template_build / legacy_build:4.1f}x"
+    )
+
+    template = await async_burst(K1("127.0.0.1", K1_ID, endpoint=LoopbackEndpoint()))
+    legacy_hub = K1("127.0.0.1", K1_ID, endpoint=LoopbackEndpoint())
+    legacy_hub._prepare_command = legacy_prepare_command.__get__(legacy_hub)
+    legacy = await async_burst(legacy_hub)
+    print(
+        f"commands  legacy={legacy:9.0f}/s templates={template:9.0f}/s "
+        f"speedup={template / legacy:4.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(async_main())
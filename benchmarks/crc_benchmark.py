@@ -0,0 +1,79 @@
+"""Benchmark the CRC engine against the original ByteUtil port."""
+
+import timeit
+
+import collections
+
+from elro.utils import AUCHCRCHI, AUCHCRCLO, crc_maker_char, get_eq_crc
+
+NUMBER = 20000
+MESSAGES = {
+    "status": "0364AAFF",
+    "name": "40404040404040404040405a6f6c64657224",
+    "table": "0364AAFF" * 64,
+}
+# A hub with sparse device ids up to 400
+DEVICES = {device_id: f"04{device_id % 256:02X}55FF" for device_id in range(1, 400, 3)}
+
+
+def legacy_crc_maker_char(msg):
+    """The original crc_maker_char, kept for comparison."""
+    uch_crc_hi = 0xFF
+    uch_crc_lo = 0xFF
+    msg_length = int(len(msg) / 2)
+    content = []
+    for _ in range(msg_length):
+        content.append(chr(int((msg[0:2]), 16)))
+        msg = msg[2:]
+    for index in range(msg_length):
+        crc_index = uch_crc_hi ^ ord(content[index])
+        uch_crc_hi = uch_crc_lo ^ AUCHCRCHI[crc_index]
+        uch_crc_lo = AUCHCRCLO[crc_index]
+    crc_lo = hex(uch_crc_hi)[2:]
+    if len(crc_lo) < 2:
+        crc_lo = "0" + crc_lo
+    crc_hi = hex(uch_crc_lo)[2:]
+    if len(crc_hi) < 2:
+        crc_hi = "0" + crc_hi
+    return f"{crc_hi.upper()}{crc_lo.upper()}"
+
+
+def legacy_get_eq_crc(devices):
+    """The original get_eq_crc, kept for comparison."""
+    sorted_devices = collections.OrderedDict(sorted(devices.items()))
+    list_length = int(list(sorted_devices.keys())[-1])
+    status_crc = ""
+    for i in range(list_length + 1):
+        if i + 1 in sorted_devices:
+            status_crc += legacy_crc_maker_char(sorted_devices[i + 1])
+        elif i < (list_length):
+            status_crc += "0000"
+    return hex((list_length * 2 + 2))[2:].rjust(4, "0") + status_crc
+
+
+def main() -> None:
+    """Print the time per CRC of both implementations."""
+    for label, message in MESSAGES.items():
+        assert crc_maker_char(message) == legacy_crc_maker_char(message)
+        legacy = timeit.timeit(lambda: legacy_crc_maker_char(message), number=NUMBER)
+        engine = timeit.timeit(lambda: crc_maker_char(message), number=NUMBER)
+        print(
+            f"{label:8s} bytes={len(message) // 2:4d} "
+            f"legacy={legacy / NUMBER * 1e6:8.2f}us "
+            f"engine={engine / NUMBER * 1e6:8.2f}us "
+            f"speedup={legacy / engine:5.1f}x"
+        )
+    assert get_eq_crc(DEVICES) == legacy_get_eq_crc(DEVICES)
+    number = NUMBER // 100
+    legacy = timeit.timeit(lambda: legacy_get_eq_crc(DEVICES), number=number)
+    engine = timeit.timeit(lambda: get_eq_crc(DEVICES), number=number)
+    print(
+        f"eq_crc   devices={len(DEVICES):4d} "
+        f"legacy={legacy / number * 1e6:8.2f}us "
+        f"engine={engine / number * 1e6:8.2f}us "
+        f"speedup={legacy / engine:5.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
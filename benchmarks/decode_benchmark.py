@@ -0,0 +1,80 @@
+"""Benchmark decoding 100k synthetic device status frames."""
+
+import random
+import time
+
+from elro.device import DEVICE_STATE, DEVICE_VALUE, STATE_NORMAL, DeviceType
+from elro.utils import get_device_state, get_device_states
+
+FRAMES = 100000
+DEVICE_CODES = ["0013", "0101", "1200", "0210", "1213", "FFFF"]
+
+
+def legacy_get_device_states(content):
+    """The original Enum and int parsing decoder, kept for comparison."""
+    return_dict = {}
+    for hexdata in content:
+        try:
+            device_type = DeviceType(hexdata["device_name"]).name
+        except ValueError:
+            continue
+        device_state = hexdata["device_status"][4:6]
+        device_value_data = int(hexdata["device_status"][6:8], 16)
+        return_dict[hexdata["device_ID"]] = {
+            "device_type": device_type,
+            "signal": int(hexdata["device_status"][0:2], 16),
+            "battery": int(hexdata["device_status"][2:4], 16),
+            "device_state": STATE_NORMAL
+            if device_state == "AA"
+            else DEVICE_STATE.get(device_state, device_state),
+            "device_value": DEVICE_VALUE.get(device_value_data, hex(device_value_data)),
+            "device_status_data": hexdata,
+            "device_value_data": device_value_data,
+        }
+    return return_dict
+
+
+def uncached_get_device_states(content):
+    """Decode with the lookup tables, bypassing the record cache."""
+    decode = get_device_state.__wrapped__
+    return_dict = {}
+    for hexdata in content:
+        device_state = decode(
+            hexdata["device_ID"], hexdata["device_name"], hexdata["device_status"]
+        )
+        if device_state is not None:
+            return_dict[hexdata["device_ID"]] = device_state
+    return return_dict
+
+
+def main() -> None:
+    """Print the decode time of each decoder."""
+    random.seed(0)
+    frames = [
+        {
+            "device_ID": index,
+            "device_name": random.choice(DEVICE_CODES),
+            "device_status": f"{random.randrange(256):02X}{random.randrange(256):02X}"
+            f"{random.choice(list(DEVICE_STATE))}{random.randrange(3):02X}",
+        }
+        for index in range(FRAMES)
+    ]
+    # Repeated polls of a 5000 device table, unchanged devices hit the cache
+    polls = [frames[:5000]] * (FRAMES // 5000)
+    for label, decoder, batches in (
+        ("legacy", legacy_get_device_states, [frames]),
+        ("tables", uncached_get_device_states, [frames]),
+        ("cached", get_device_states, polls),
+    ):
+        start = time.perf_counter()
+        for batch in batches:
+            result = decoder(batch)
+        duration = time.perf_counter() - start
+        print(
+            f"{label:6s} frames={FRAMES} devices={len(result)} "
+            f"time={duration * 1000:7.1f}ms per_frame={duration / FRAMES * 1e6:5.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
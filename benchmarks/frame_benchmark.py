@@ -0,0 +1,54 @@
+"""Benchmark the frame parser over the captured frames of the API tests."""
+
+import json
+import timeit
+
+from elro.frame import json_loads, parse_frame
+from tests.test_api import (
+    MOCK_DEVICE_STATUS_RESPONSE,
+    MOCK_GET_DEVICE_NAME_RESPONSE,
+    MOCK_SCENE_RESPONSE,
+    MOCK_SOCKET_STATUS_ON_RESPONSE,
+)
+
+NUMBER = 2000
+FRAMES = (
+    MOCK_SCENE_RESPONSE
+    + MOCK_DEVICE_STATUS_RESPONSE
+    + MOCK_GET_DEVICE_NAME_RESPONSE
+    + MOCK_SOCKET_STATUS_ON_RESPONSE
+    + [b"{ST_answer_OK}"] * 4
+    # A status frame missing its closing brackets
+    + [MOCK_DEVICE_STATUS_RESPONSE[0].rstrip()[:-2]]
+)
+
+
+def legacy_parse_frame(data):
+    """The original decode, compare and parse with retry, kept for comparison."""
+    json_string = data.decode("utf-8")
+    if json_string.strip().casefold() == "{ST_answer_OK}".casefold():
+        return None
+    try:
+        return json.loads(json_string)
+    except json.decoder.JSONDecodeError:
+        return json.loads(json_string + "}}")
+
+
+def main() -> None:
+    """Print the time per frame of both parsers."""
+    for frame in FRAMES:
+        assert parse_frame(frame)[1] == legacy_parse_frame(frame)
+    count = NUMBER * len(FRAMES)
+    legacy = timeit.timeit(
+        lambda: [legacy_parse_frame(frame) for frame in FRAMES], number=NUMBER
+    )
+    parser = timeit.timeit(lambda: [parse_frame(frame) for frame in FRAMES], number=NUMBER)
+    print(f"json backend: {json_loads.__module__}")
+    print(
+        f"frames={len(FRAMES)} legacy={legacy / count * 1e6:6.2f}us "
+        f"parser={parser / count * 1e6:6.2f}us speedup={legacy / parser:4.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
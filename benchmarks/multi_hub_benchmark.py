@@ -0,0 +1,61 @@
+"""Benchmark polling throughput for a number of simulated K1 hubs."""
+
+import asyncio
+import sys
+import time
+
+from elro.api import K1
+from elro.command import GET_ALL_EQUIPMENT_STATUS
+from elro.simulator import K1Simulator
+
+LATENCY = 0.05
+DURATION = 2.0
+
+
+async def async_poll(hub: K1, deadline: float) -> int:
+    """Poll a hub until the deadline and return the number of polls."""
+    polls = 0
+    while time.monotonic() < deadline:
+        await hub.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+        polls += 1
+    await hub.async_disconnect()
+    return polls
+
+
+async def async_benchmark(hub_count: int) -> float:
+    """Return the poll throughput for hub_count hubs."""
+    servers = []
+    hubs = []
+    for index in range(hub_count):
+        k1_id = f"ST_{index:012x}"
+        # Like the hub, send the next frame after the previous one was acknowledged
+        simulator = K1Simulator(k1_id, devices=1, latency=LATENCY, ack_pacing=True)
+        host, port = await simulator.async_start()
+        servers.append(simulator)
+        hubs.append(K1(host, k1_id, port=port))
+    try:
+        start = time.monotonic()
+        polls = await asyncio.gather(
+            *(async_poll(hub, start + DURATION) for hub in hubs)
+        )
+        return sum(polls) / (time.monotonic() - start)
+    finally:
+        for simulator in servers:
+            simulator.close()
+
+
+async def async_main(hub_counts: list[int]) -> None:
+    """Run the benchmark for each number of hubs."""
+    baseline = None
+    for hub_count in hub_counts:
+        throughput = await async_benchmark(hub_count)
+        baseline = baseline or throughput / hub_count
+        print(
+            f"hubs={hub_count:4d} polls/s={throughput:8.1f} "
+            f"scaling={throughput / baseline:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    # argv: hub counts to benchmark, e.g. 1 2 4 8 16 32
+    asyncio.run(async_main([int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8, 16, 32]))
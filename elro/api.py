@@ -3,19 +3,36 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import contextlib
 import logging
-from typing import Mapping, cast, Any, TypedDict
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Mapping, cast, Any, TypedDict
 
 from elro.command import (
     Command,
     CommandAttributes,
     ACK_APP,
     CMD_CONNECT,
+    GET_DEVICE_NAMES,
+    IDEMPOTENT_COMMANDS,
+    SYN_DEVICE_STATUS,
 )
-from elro.utils import (
-    validate_json,
+from elro.endpoint import K1SharedEndpoint
+from elro.event import K1Event, parse_event
+from elro.frame import FrameBuilder, FrameType, parse_frame
+from elro.metrics import (
+    K1Metrics,
+    MetricSink,
+    METRIC_ACKS,
+    METRIC_ACKS_RECEIVED,
+    METRIC_RECONNECTS,
+    METRIC_REPAIRS,
+    METRIC_TIMEOUTS,
 )
+from elro.rtt import RttEstimator
+from elro.state import DeviceNameCache, DeviceStateStore
+from elro.utils import get_eq_crc
 
 ATTR_BIND = "BIND"
 ATTR_KEY = "KEY"
@@ -26,18 +43,37 @@ APP_ID = 0
 TIME_OUT = 10
 INTERVAL = 5
 UDP_PORT_NO = 1025
+INBOUND_QUEUE_SIZE = 1024
+EVENT_QUEUE_SIZE = 256
+KEEPALIVE_INTERVAL = 30
+RECONNECT_BACKOFF_MIN = 1
+RECONNECT_BACKOFF_MAX = 300
+BULK_PACING = 0.05
+MAX_RETRANSMITS = 2
+# Replies in a row that must echo the msgId of their command before the
+# answers to bulk control are matched by msgId
+MSG_ID_ECHO_CHECKS = 3
+
+# Reply types merged into the device state store
+STATE_COMMANDS = (Command.DEVICE_STATUS_UPDATE, Command.DEVICE_ALARM_TRIGGER)
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class K1UDPHandler(asyncio.BaseProtocol):
-    """UDP test class."""
+    """UDP handler queueing all received datagrams."""
 
-    def __init__(self, message, on_con_lost, datagram_data):
+    def __init__(self, message, on_con_lost, queue_size: int = INBOUND_QUEUE_SIZE):
         self.message = message
         self.on_con_lost = on_con_lost
         self._transport = None
-        self.datagram_data = datagram_data
+        self.inbound: asyncio.Queue[tuple[bytes | None, Any]] = asyncio.Queue(
+            queue_size
+        )
+        self.received = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.last_received = time.monotonic()
         self.last_exc = None
 
     def connection_made(self, transport):
@@ -47,8 +83,19 @@ class K1UDPHandler(asyncio.BaseProtocol):
 
     def datagram_received(self, data, addr):
         """Datagram reveived."""
-        if not self.datagram_data.done():
-            self.datagram_data.set_result((data, addr))
+        self.received += 1
+        self.last_received = time.monotonic()
+        try:
+            self.inbound.put_nowait((data, addr))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            _LOGGER.warning(
+                "Inbound queue full, dropped datagram from %s (%s dropped)",
+                addr,
+                self.dropped,
+            )
+            return
+        self.high_water = max(self.high_water, self.inbound.qsize())
 
     def close_connection(self):
         """Close the connection."""
@@ -63,16 +110,27 @@ class K1UDPHandler(asyncio.BaseProtocol):
         """Connection lost."""
         self.last_exc = exc
         self.on_con_lost.set_result(True)
-        if not self.datagram_data.done():
-            self.datagram_data.set_result((None, None))
+        if self.inbound.full():
+            # Make room for the sentinel, the connection is gone anyway
+            self.inbound.get_nowait()
+            self.dropped += 1
+        self.inbound.put_nowait((None, None))
+
+
+@dataclass
+class PendingCommand:
+    """A command waiting for its reply frames."""
+
+    msg_id: int
+    attributes: CommandAttributes
+    frames: asyncio.Queue = field(default_factory=asyncio.Queue)
+    # Queue (msgId, frame data) tuples, used to match replies of a bulk command
+    with_msg_id: bool = False
 
 
 class K1:
     """API class to Elro connects K1 adapter."""
 
-    _lock = asyncio.Lock()
-    _loop: asyncio.AbstractEventLoop | None = None
-
     class K1ConnectionError(Exception):
         """K1 exception class."""
 
@@ -86,19 +144,67 @@ class K1:
         received: int
 
     def __init__(
-        self, ipaddress: str, k1_id: str, port: int = 1025, api_key: str | None = None
+        self,
+        ipaddress: str,
+        k1_id: str,
+        port: int = 1025,
+        api_key: str | None = None,
+        endpoint: K1SharedEndpoint | None = None,
     ) -> None:
-        """Initialize the module."""
+        """Initialize the module.
+
+        Pass a shared endpoint to use one UDP socket for many hubs.
+        """
+        # Lock and loop are kept per hub, so hubs do not block each other
+        self._lock = asyncio.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
         self._transport = None
         self._protocol = None
+        self._reader: asyncio.Task | None = None
+        self._keepalive: asyncio.Task | None = None
+        self._handshake: asyncio.Future | None = None
+        self._handshakes = 0
+        self._endpoints = 0
+        self._repaired_frames = 0
+        self._retransmits = 0
+        self._metrics: K1Metrics | None = None
+        # Round trip time of the first reply per command, and of the next frames
+        self._rtt: dict[Command, RttEstimator] = {}
+        self._frame_gap = RttEstimator()
         self._remoteaddress = (ipaddress, port)
+        self._shared_endpoint = endpoint
         self._k1_id = k1_id
         self._session: dict[str, str] = {}
         self._msg_id = 0
+        self._frame_builder: FrameBuilder | None = None
         self._api_key = api_key
+        # In-flight commands by the reply types they are waiting for
+        self._receivers: dict[Command, PendingCommand] = {}
+        self._channel_locks: dict[Command, asyncio.Lock] = {}
+        self._msg_id_echoes = 0
+        self._subscribers: set[asyncio.Queue] = set()
+        self._device_states = DeviceStateStore()
+        # Reported status per device, also of unsupported device types, the
+        # hub resends every device missing from the CRC vector
+        self._device_statuses: dict[int, str] = {}
+        self._device_names = DeviceNameCache()
 
     async def async_connect(self) -> None:
         """Connect to the K1 hub."""
+        self._loop = asyncio.get_running_loop()
+        if not self._loop:
+            return
+        await self._lock.acquire()
+        try:
+            await self._async_connect()
+        finally:
+            self._lock.release()
+
+    async def _async_connect(self) -> None:
+        """Do the handshake with the K1 hub, the lock must be held.
+
+        An open transport is reused, only the session is refreshed.
+        """
 
         def _store_session(self, data: str) -> None:
             """Stores the session details."""
@@ -111,154 +217,421 @@ class K1:
                 if self._api_key:
                     self._session[ATTR_KEY] = self._api_key
 
-        self._loop = asyncio.get_running_loop()
-        if not self._loop:
-            return
-        on_conn_lost, datagram_data = (
-            self._loop.create_future(),
-            self._loop.create_future(),
-        )
         payload = (CMD_CONNECT + self._k1_id).encode("utf-8")
-        await self._lock.acquire()
+        self._session = {}
+        self._handshake = self._loop.create_future()
+        self._handshakes += 1
+        if self._metrics is not None and self._handshakes > 1:
+            self._metrics.count(METRIC_RECONNECTS)
         try:
-            self._transport, self._protocol = await self._loop.create_datagram_endpoint(  # type: ignore
-                lambda: K1UDPHandler(payload, on_conn_lost, datagram_data),
-                remote_addr=self._remoteaddress,
-            )
-            await asyncio.wait_for(datagram_data, TIME_OUT)
-            if data := datagram_data.result():
-                _store_session(self, data[0].decode("utf-8"))
-                return
-            raise K1.K1ConnectionError(
-                "No data received, cannot connect to "
-                f"hub {self._remoteaddress[0]} with id {self._k1_id}."
-            )
+            if self._connected:
+                self._transport.sendto(payload)
+            else:
+                self._close_transport()
+                on_conn_lost = self._loop.create_future()
+                if self._shared_endpoint is not None:
+                    (
+                        self._transport,
+                        self._protocol,
+                    ) = await self._shared_endpoint.async_create_endpoint(
+                        lambda: K1UDPHandler(payload, on_conn_lost),
+                        self._remoteaddress,
+                        self._k1_id,
+                    )
+                else:
+                    self._transport, self._protocol = await self._loop.create_datagram_endpoint(  # type: ignore
+                        lambda: K1UDPHandler(payload, on_conn_lost),
+                        remote_addr=self._remoteaddress,
+                    )
+                self._endpoints += 1
+                self._reader = self._loop.create_task(
+                    self._async_receive_frames(self._protocol)
+                )
+            data = await asyncio.wait_for(self._handshake, TIME_OUT)
+            if data is None:
+                raise K1.K1ConnectionError(
+                    "No data received, cannot connect to "
+                    f"hub {self._remoteaddress[0]} with id {self._k1_id}."
+                )
+            _store_session(self, data.decode("utf-8"))
         except (ValueError, asyncio.TimeoutError) as exception:
             raise K1.K1ConnectionError(
                 "Not received the expected result, cannot connect to "
                 f"hub {self._remoteaddress[0]} with id {self._k1_id}."
                 f" {exception.args}"
             ) from exception
+        finally:
+            self._handshake = None
+
+    @property
+    def _connected(self) -> bool:
+        """Return True if the transport is open."""
+        return bool(
+            self._transport and self._protocol and not self._protocol.on_con_lost.done()
+        )
+
+    async def _async_ensure_session(self) -> None:
+        """Connect if there is no active session."""
+        if self._session:
+            return
+        self._loop = asyncio.get_running_loop()
+        await self._lock.acquire()
+        try:
+            # A concurrent command may have connected while waiting
+            if not self._session:
+                await self._async_connect()
         finally:
             self._lock.release()
 
+    def _close_transport(self) -> None:
+        """Stop receiving, fail in-flight commands and close the transport."""
+        if self._reader:
+            self._reader.cancel()
+            self._reader = None
+        self._fail_pending()
+        if self._connected:
+            self._transport.close()
+        self._transport = None
+        self._protocol = None
+        self._session = {}
+
+    def _fail_pending(self) -> None:
+        """Wake up all in-flight commands with a lost connection sentinel."""
+        # A command waiting for several reply types is woken up once
+        for pending in {id(item): item for item in self._receivers.values()}.values():
+            pending.frames.put_nowait(None)
+
+    async def _async_receive_frames(self, protocol: K1UDPHandler) -> None:
+        """Read the inbound queue and route frames to in-flight commands."""
+        while True:
+            data, _ = await protocol.inbound.get()
+            if data is None:
+                if self._handshake and not self._handshake.done():
+                    self._handshake.set_result(None)
+                self._fail_pending()
+                self._end_subscriptions(
+                    K1.K1ConnectionError(
+                        f"Connection to hub {self._remoteaddress[0]} was lost."
+                    )
+                )
+                return
+            self._dispatch_frame(data)
+
+    def _dispatch_frame(self, data: bytes) -> None:
+        """Route a frame to the command waiting for its reply type."""
+        if (
+            self._handshake
+            and not self._handshake.done()
+            and not data.lstrip().startswith(b"{")
+        ):
+            self._handshake.set_result(data)
+            return
+        try:
+            frame_type, frame = parse_frame(data)
+            if frame is None:
+                if self._metrics is not None:
+                    self._metrics.count(METRIC_ACKS_RECEIVED)
+                return
+            if frame_type == FrameType.TRUNCATED:
+                self._repaired_frames += 1
+                if self._metrics is not None:
+                    self._metrics.count(METRIC_REPAIRS)
+            frame_data = frame["params"]["data"]
+            command = Command(frame_data["cmdId"])
+        except (ValueError, KeyError, TypeError):
+            _LOGGER.warning(
+                "Ignoring invalid frame from hub %s: %s", self._remoteaddress[0], data
+            )
+            return
+        # Alarms are pushed at any time, also in the middle of a status poll
+        # waiting for them, they are published instead of added to the reply
+        pending = (
+            None
+            if command == Command.DEVICE_ALARM_TRIGGER
+            else self._receivers.get(command)
+        )
+        if self._transport:
+            self._transport.sendto(ACK_APP.encode("utf-8"))
+            if self._metrics is not None:
+                self._metrics.count(METRIC_ACKS, command.name)
+        if pending is not None and not pending.with_msg_id:
+            if frame.get("msgId") == pending.msg_id:
+                self._msg_id_echoes += 1
+            else:
+                self._msg_id_echoes = 0
+        if pending is not None:
+            pending.frames.put_nowait(
+                (frame.get("msgId"), frame_data) if pending.with_msg_id else frame_data
+            )
+        publish = pending is None
+        if not (publish and self._subscribers) and command not in STATE_COMMANDS:
+            if pending is None:
+                _LOGGER.debug("No subscribers for unsolicited frame: %s", frame_data)
+            return
+        try:
+            event = parse_event(command, frame_data)
+        except (ValueError, KeyError, TypeError):
+            _LOGGER.warning("Ignoring invalid event data: %s", frame_data)
+            return
+        if event is None:
+            return
+        if command == Command.DEVICE_STATUS_UPDATE:
+            self._device_statuses[event.device_id] = frame_data["device_status"]
+        if event.state is not None:
+            self._device_names.check_device(event.device_id)
+            self._device_states.update({event.device_id: event.state})
+        if publish:
+            self._publish(event)
+
+    def _publish(self, event: K1Event) -> None:
+        """Publish an event to the subscribers."""
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow subscriber, drop the oldest event
+                _LOGGER.warning("Event queue full, dropped %s", queue.get_nowait())
+            queue.put_nowait(event)
+
+    def _end_subscriptions(self, error: Exception | None = None) -> None:
+        """End all event subscriptions, raising error in the subscribers if set."""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(error)
+
+    async def async_events(self) -> AsyncIterator[K1Event]:
+        """Keep the connection open and yield the events pushed by the hub.
+
+        The pushed frames are acknowledged automatically. The iteration ends
+        when the hub is disconnected, and raises when the connection is lost.
+        """
+        queue: asyncio.Queue[K1Event | Exception | None] = asyncio.Queue(
+            EVENT_QUEUE_SIZE
+        )
+        self._subscribers.add(queue)
+        try:
+            await self._async_ensure_session()
+            while (event := await queue.get()) is not None:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
     async def async_disconnect(self) -> None:
         """Disconnect from the K1 hub."""
+        if self._keepalive:
+            self._keepalive.cancel()
+            # The transport is closed, even if the keepalive ended with an error
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._keepalive
+            self._keepalive = None
         if not self._protocol:
             return
         await self._lock.acquire()
         try:
-            if self._transport and not self._protocol.on_con_lost.done():
-                self._transport.close()
-                self._transport = None
-                self._protocol = None
-                self._session = {}
+            self._close_transport()
+            self._end_subscriptions()
         finally:
             self._lock.release()
 
+    async def async_start_keepalive(self, interval: float = KEEPALIVE_INTERVAL) -> None:
+        """Keep the session alive until disconnected.
+
+        The hub is probed with a delta status sync when nothing was received
+        for interval seconds, if the probe fails the session is restored with
+        exponential backoff.
+        """
+        self._loop = asyncio.get_running_loop()
+        if self._keepalive is None:
+            self._keepalive = self._loop.create_task(self._async_keepalive(interval))
+
+    async def _async_keepalive(self, interval: float) -> None:
+        """Probe the hub when idle and reconnect with backoff on failures."""
+        backoff = RECONNECT_BACKOFF_MIN
+        while True:
+            idle = (
+                time.monotonic() - self._protocol.last_received
+                if self._protocol and self._session
+                else interval
+            )
+            if idle < interval:
+                await asyncio.sleep(interval - idle)
+                continue
+            try:
+                await self.async_sync_device_status()
+            except K1.K1ConnectionError as error:
+                _LOGGER.warning(
+                    "Keepalive for hub %s failed, retry in %s seconds: %s",
+                    self._remoteaddress[0],
+                    backoff,
+                    error,
+                )
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception(
+                    "Unexpected error in keepalive for hub %s, retry in %s seconds",
+                    self._remoteaddress[0],
+                    backoff,
+                )
+            else:
+                backoff = RECONNECT_BACKOFF_MIN
+                continue
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
     async def async_configure(
         self, ipaddress: str, port: int = 1025, api_key: str | None = None
     ) -> None:
         """Process updated settings."""
         try:
             await self._lock.acquire()
-            if self._transport and not self._protocol.on_con_lost.done():
-                self._transport.close()
+            self._close_transport()
         finally:
-            self._transport = None
-            self._protocol = None
-            self._session = {}
             self._api_key = api_key
             self._remoteaddress = (ipaddress, port)
             self._lock.release()
 
-    def _prepare_command(self, command_data: dict) -> bytes:
+    def _prepare_command(
+        self, attributes: CommandAttributes, argv: dict[str, Any]
+    ) -> bytes:
         """
-        Construct a valid message from data
-        :param data: A string containing data to be send to the K1
+        Construct a valid message from the command attributes and arguments
+        :param attributes: The attributes of the command
+        :param argv: The arguments of the command
         :return: A json message
         """
         self._msg_id += 1
 
-        command = {
-            "msgId": self._msg_id,
-            "action": "appSend",
-            "params": {
-                "devTid": self._session[ATTR_NAME],
-                "ctrlKey": self._session[ATTR_KEY],
-                "appTid": 1,
-                "data": command_data,
-            },
-        }
-        return json.dumps(command).encode("utf-8")
+        session = (self._session[ATTR_NAME], self._session[ATTR_KEY])
+        if self._frame_builder is None or self._frame_builder.session != session:
+            self._frame_builder = FrameBuilder(*session)
+        return self._frame_builder.build(
+            self._msg_id,
+            attributes["cmd_id"].value,
+            attributes["additional_attributes"],
+            argv,
+        )
 
     async def async_process_command(
         self,
         attributes: CommandAttributes,
         **argv: int | str,
     ) -> dict[int, dict[str, Any]] | None:
-        """Get device names."""
-        if not self._session:
-            await self.async_connect()
-        await self._lock.acquire()
-        iteration = 0
+        """Send a command and return the transformed reply content."""
+        await self._async_ensure_session()
+
+        device_name = (
+            argv.get("device_name")
+            if attributes["cmd_id"] == Command.MODIFY_EQUIPMENT_NAME
+            else None
+        )
+        if attributes["attribute_transformer"]:
+            attributes["attribute_transformer"](argv)
+        command_data = {
+            "cmdId": attributes["cmd_id"].value,
+        }
+        command_data.update(attributes["additional_attributes"])
+        if argv:
+            command_data.update(cast(Mapping[str, Any], argv))
+
+        async with self._async_hold_channels(attributes["receive_types"]):
+            result = await self._async_exchange(attributes, command_data, argv)
+        if device_name:
+            device_id = command_data["device_ID"]
+            self._device_names.set_name(device_id, cast(str, device_name))
+            self._device_states.update({device_id: {"name": device_name}})
+        return result
+
+    @contextlib.asynccontextmanager
+    async def _async_hold_channels(
+        self, receive_types: Iterable[Command]
+    ) -> AsyncIterator[None]:
+        """Hold the locks of reply types, the hub does not echo the msgId.
+
+        Replies are routed by their type, so commands waiting for the same
+        reply type are serialized and all other commands are pipelined.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            for receive_type in sorted(
+                set(receive_types), key=lambda command: command.value
+            ):
+                await stack.enter_async_context(
+                    self._channel_locks.setdefault(receive_type, asyncio.Lock())
+                )
+            yield
+
+    async def _async_exchange(
+        self,
+        attributes: CommandAttributes,
+        command_data: dict[str, Any],
+        argv: dict[str, Any],
+    ) -> dict[int, dict[str, Any]] | None:
+        """Send a command and collect the reply frames routed to it."""
         if (
             not self._protocol
             or not self._transport
             or not self._loop
             or ATTR_KEY not in self._session
         ):
-            self._lock.release()
             raise K1.K1ConnectionError(
                 "Not connected to a K1 hub or incorrect API key."
             )
 
-        if attributes["attribute_transformer"]:
-            attributes["attribute_transformer"](argv)
-        command_data = {
-            "cmdId": attributes["cmd_id"].value,
-        }
-        command_data.update(attributes["additional_attributes"])
-        if argv:
-            command_data.update(cast(Mapping[str, Any], argv))
-        command = self._prepare_command(command_data)
+        command = self._prepare_command(attributes, argv)
+        pending = PendingCommand(self._msg_id, attributes)
+        for receive_type in attributes["receive_types"]:
+            self._receivers[receive_type] = pending
+        iteration = 0
         contentlist = []
+        retransmits = 0
+        rtt = self._rtt.setdefault(attributes["cmd_id"], RttEstimator())
         try:
-            self._protocol.datagram_data = self._loop.create_future()
             self._transport.sendto(command)
+            sent = last_frame = time.monotonic()
             while True:
-                # Run loop until last item
-                await asyncio.wait_for(self._protocol.datagram_data, TIME_OUT)
-                if raw_data := self._protocol.datagram_data.result():
-                    iteration += 1
+                # Run loop until last item, the first reply and the next
+                # frames have their own time out
+                estimator = self._frame_gap if iteration else rtt
+                try:
+                    frame_data = await asyncio.wait_for(
+                        pending.frames.get(), estimator.timeout(TIME_OUT)
+                    )
+                except asyncio.TimeoutError:
+                    estimator.backoff()
+                    if self._metrics is not None:
+                        self._metrics.count(METRIC_TIMEOUTS, attributes["cmd_id"].name)
+                    if (
+                        iteration
+                        or retransmits >= MAX_RETRANSMITS
+                        or attributes["cmd_id"] not in IDEMPOTENT_COMMANDS
+                    ):
+                        raise
+                    retransmits += 1
+                    self._retransmits += 1
+                    _LOGGER.debug("Retransmitting command %s", command_data)
+                    self._transport.sendto(command)
+                    continue
+                if frame_data is None:
+                    raise ValueError("Connection lost")
+                now = time.monotonic()
+                if iteration:
+                    self._frame_gap.add_sample(now - last_frame)
+                elif not retransmits:
+                    # The reply to a retransmitted command is ambiguous
+                    rtt.add_sample(now - sent)
+                last_frame = now
+                iteration += 1
+                if _LOGGER.isEnabledFor(logging.DEBUG):
                     _LOGGER.debug(
                         "command attributes: %s received[%s]: %s",
                         command_data,
                         iteration,
-                        raw_data[0].decode("utf-8").strip()
-                        if raw_data[0] is not None
-                        else None,
+                        frame_data,
                     )
-                    self._protocol.datagram_data = self._loop.create_future()
-                    if (
-                        raw_data[0].decode("utf-8").strip().casefold()
-                        == "{ST_answer_OK}".casefold()
-                    ):
-                        continue
-                    data = validate_json(raw_data[0])
-                    params = data["params"]
-                    cmd_id = params["data"]["cmdId"]
-                    content = params["data"].get(attributes["content_field"], "")
-                    if Command(cmd_id) in attributes["receive_types"]:
-                        self._transport.sendto(ACK_APP.encode("utf-8"))
-                        if content == attributes["content_sync_finished"]:
-                            break
-                        contentlist.append(params["data"])
-
-                else:
-                    self._transport.sendto(ACK_APP.encode("utf-8"))
+                content = frame_data.get(attributes["content_field"], "")
+                if content == attributes["content_sync_finished"]:
                     break
-        except (ValueError, asyncio.TimeoutError, asyncio.CancelledError) as exception:
+                contentlist.append(frame_data)
+        except (ValueError, asyncio.TimeoutError) as exception:
             self._session = {}
             raise K1.K1ConnectionError(
                 "Not received the expected result, cannot connect to "
@@ -266,12 +639,211 @@ class K1:
                 f" {exception.args}"
             ) from exception
         finally:
-            self._lock.release()
-        return (
-            attributes["content_transformer"](contentlist)
-            if attributes["content_transformer"] is not None
-            else None
+            for receive_type in attributes["receive_types"]:
+                if self._receivers.get(receive_type) is pending:
+                    del self._receivers[receive_type]
+        if self._metrics is not None:
+            self._metrics.observe_command(
+                attributes["cmd_id"].name, last_frame - sent, iteration
+            )
+        if attributes["content_transformer"] is None:
+            return None
+        result = attributes["content_transformer"](contentlist)
+        if attributes["cmd_id"] == Command.GET_DEVICE_NAME:
+            self._device_names.update(result)
+            self._device_states.update(result)
+        return result
+
+    async def async_bulk_control(
+        self,
+        commands: Iterable[tuple[int, CommandAttributes]],
+        pacing: float = BULK_PACING,
+    ) -> list[bool | None]:
+        """Send control commands to many devices, return which were answered.
+
+        commands are (device_ID, command) pairs, like SOCKET_ON, answered with
+        ANSWER_YES_OR_NO. The commands are sent pacing seconds apart without
+        waiting for the replies, so a scene takes about one round trip.
+        Answers are only matched to commands by msgId if the hub was seen
+        echoing the msgId, otherwise the answers are counted. The result per
+        command is True if it was answered and False if not. It is None if
+        it is unknown which of the commands were answered.
+        """
+        commands = list(commands)
+        for _, attributes in commands:
+            if attributes["receive_types"] != [Command.ANSWER_YES_OR_NO]:
+                raise ValueError(
+                    f"Command {attributes['cmd_id'].name} is not a control command"
+                )
+        await self._async_ensure_session()
+        async with self._async_hold_channels([Command.ANSWER_YES_OR_NO]):
+            return await self._async_bulk_exchange(commands, pacing)
+
+    async def _async_bulk_exchange(
+        self, commands: list[tuple[int, CommandAttributes]], pacing: float
+    ) -> list[bool | None]:
+        """Pipeline control commands, the ANSWER_YES_OR_NO channel must be held."""
+        if (
+            not self._protocol
+            or not self._transport
+            or not self._loop
+            or ATTR_KEY not in self._session
+        ):
+            raise K1.K1ConnectionError(
+                "Not connected to a K1 hub or incorrect API key."
+            )
+        results: list[bool | None] = [False] * len(commands)
+        if not commands:
+            return results
+        bulk = PendingCommand(0, commands[0][1], with_msg_id=True)
+        self._receivers[Command.ANSWER_YES_OR_NO] = bulk
+        # Indexes of the commands waiting for an answer by msgId
+        outstanding: dict[int, int] = {}
+        # Answers that are not matched to a command by msgId
+        uncorrelated = 0
+        echoed = self._msg_id_echoes >= MSG_ID_ECHO_CHECKS
+
+        async def _async_send() -> None:
+            """Send the commands pacing seconds apart."""
+            for index, (device_id, attributes) in enumerate(commands):
+                if index:
+                    await asyncio.sleep(pacing)
+                command = self._prepare_command(attributes, {"device_ID": device_id})
+                outstanding[self._msg_id] = index
+                self._transport.sendto(command)
+
+        sender = self._loop.create_task(_async_send())
+        try:
+            while not sender.done() or len(outstanding) > uncorrelated:
+                try:
+                    item = await asyncio.wait_for(
+                        bulk.frames.get(),
+                        self._rtt.setdefault(
+                            bulk.attributes["cmd_id"], RttEstimator()
+                        ).timeout(TIME_OUT),
+                    )
+                except asyncio.TimeoutError:
+                    if self._metrics is not None:
+                        self._metrics.count(
+                            METRIC_TIMEOUTS, bulk.attributes["cmd_id"].name
+                        )
+                    break
+                if item is None:
+                    self._session = {}
+                    break
+                msg_id, frame_data = item
+                content = frame_data.get(bulk.attributes["content_field"])
+                if content != bulk.attributes["content_sync_finished"]:
+                    continue
+                if echoed and msg_id in outstanding:
+                    results[outstanding.pop(msg_id)] = True
+                else:
+                    uncorrelated += 1
+        finally:
+            sender.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sender
+            if self._receivers.get(Command.ANSWER_YES_OR_NO) is bulk:
+                del self._receivers[Command.ANSWER_YES_OR_NO]
+        if uncorrelated:
+            # Without a matching msgId the commands are only known to be
+            # answered if all of them were
+            answered = True if uncorrelated >= len(outstanding) else None
+            for index in outstanding.values():
+                results[index] = answered
+        elif not any(results):
+            # Nothing was answered, the session is probably gone
+            self._session = {}
+        return results
+
+    async def async_sync_device_status(self) -> dict[int, dict[str, Any]]:
+        """Fetch only the devices whose status differs from the cached states.
+
+        SYN_DEVICE_STATUS is sent with the CRC vector of the statuses reported
+        by the hub, the hub only replies with the devices that changed.
+        Returns the changed devices.
+        """
+        version = self._device_states.version
+        statuses = self._device_statuses
+        await self.async_process_command(
+            SYN_DEVICE_STATUS, device_status=get_eq_crc(statuses) if statuses else ""
         )
+        return self._device_states.changed_since(version)
+
+    async def async_get_device_names(
+        self, refresh: bool = False
+    ) -> dict[int, dict[str, Any]]:
+        """Return the device names, only fetched from the hub if not cached."""
+        if not refresh and (names := self._device_names.get()) is not None:
+            return names
+        return await self.async_process_command(GET_DEVICE_NAMES)
+
+    @property
+    def inbound_statistics(self) -> dict[str, int]:
+        """Return the received, dropped, queued and repaired datagram counters."""
+        if not self._protocol:
+            return {}
+        return {
+            "received": self._protocol.received,
+            "dropped": self._protocol.dropped,
+            "queued": self._protocol.inbound.qsize(),
+            "high_water": self._protocol.high_water,
+            "repaired": self._repaired_frames,
+        }
+
+    @property
+    def device_states(self) -> DeviceStateStore:
+        """Return the device states, updated with every status and name reply."""
+        return self._device_states
+
+    @property
+    def name_cache_statistics(self) -> dict[str, int]:
+        """Return the name cache hits and misses."""
+        return {"hits": self._device_names.hits, "misses": self._device_names.misses}
+
+    @property
+    def connection_statistics(self) -> dict[str, int]:
+        """Return the number of handshakes, created endpoints and retransmits."""
+        return {
+            "handshakes": self._handshakes,
+            "endpoints": self._endpoints,
+            "retransmits": self._retransmits,
+        }
+
+    def enable_metrics(self, sink: MetricSink | None = None) -> K1Metrics:
+        """Collect metrics, optionally passing every observation to sink.
+
+        Metrics are not collected until they are enabled.
+        """
+        if self._metrics is None:
+            self._metrics = K1Metrics(self._k1_id)
+        if sink is not None:
+            self._metrics.add_sink(sink)
+        return self._metrics
+
+    def disable_metrics(self) -> None:
+        """Stop collecting metrics."""
+        self._metrics = None
+
+    @property
+    def metrics(self) -> K1Metrics | None:
+        """Return the collected metrics, None if metrics are not enabled."""
+        return self._metrics
+
+    @property
+    def round_trip_statistics(self) -> dict[str, dict[str, float | None]]:
+        """Return the smoothed round trip times and time outs per command."""
+        return {
+            name: {
+                "srtt": estimator.srtt,
+                "rttvar": estimator.rttvar,
+                "timeout": estimator.timeout(TIME_OUT),
+            }
+            for name, estimator in (
+                *((command.name, estimator) for command, estimator in self._rtt.items()),
+                ("FRAME_GAP", self._frame_gap),
+            )
+        }
 
     @property
     def api_key(self) -> str | None:
@@ -2,15 +2,17 @@
 
 from __future__ import annotations
 import asyncio
-from datetime import datetime
+import contextlib
+import ipaddress
+from datetime import datetime, timedelta
 from json import dumps
 from dataclasses import dataclass
 from typing import TypedDict
 
 
-import socket
 import json
 import logging
+import time
 import aiohttp
 
 
@@ -19,9 +21,22 @@ PID = "01288154146"
 BASE_UAA_URL = "https://uaa-openapi."
 BASE_USER_URL = "https://user-openapi."
 DEFAULT_DOMAIN = "hekr.me"
+USER_AGENT = "lib-elro-connects"
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+KEEPALIVE_TIMEOUT = 60
+DOMAIN_HOST = "info.hekr.me"
+DOMAIN_PORT = 91
+DOMAIN_TIMEOUT = 5.0
+# Seconds a discovered domain is cached, a failed lookup is retried sooner
+DOMAIN_CACHE_TTL = 86400
+DOMAIN_RETRY_TTL = 300
 
 _LOGGER = logging.getLogger(__name__)
 
+# Process wide cache of the discovered domain and its expiry time per host
+_DOMAIN_CACHE: dict[tuple[str, int], tuple[str, float]] = {}
+
 
 @dataclass
 class ElroConnectsCloudSessionCache(TypedDict):
@@ -48,15 +63,55 @@ class ElroConnectsConnector(TypedDict):
     sw_version: str
     model: str
     online: bool
+    ip: str | None
 
 
 class ElroConnectsSession:
-    """Elro Connects Cloud session."""
-
-    def __init__(self) -> None:
+    """Elro Connects Cloud session.
+
+    The HTTP session is kept open to reuse connections, pass an
+    aiohttp.ClientSession to share it, or use the session as an async
+    context manager or call async_close when done.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        domain_cache_file: str | None = None,
+    ) -> None:
         """Initialize."""
         self._session_cache = None
         self._domain = None
+        self._domain_cache_file = domain_cache_file
+        self._credentials: tuple[str, str] | None = None
+        self._http_session = session
+        self._owns_http_session = session is None
+        # Concurrent requests wait for one token refresh
+        self._token_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> ElroConnectsSession:
+        """Enter the session, the HTTP session is closed on exit."""
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the HTTP session."""
+        await self.async_close()
+
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session, create one if there is no open session."""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                json_serialize=dumps,
+                connector=aiohttp.TCPConnector(keepalive_timeout=KEEPALIVE_TIMEOUT),
+            )
+            self._owns_http_session = True
+        return self._http_session
+
+    async def async_close(self) -> None:
+        """Close the HTTP session if it was created by this session."""
+        if self._owns_http_session and self._http_session is not None:
+            await self._http_session.close()
+        self._http_session = None
 
     async def async_login(
         self, username: str, password: str
@@ -69,21 +124,73 @@ class ElroConnectsSession:
             "clientType": CLIENT_TYPE,
         }
         headers = {
-            "User-Agent": "lib-elro-connects",
+            "User-Agent": USER_AGENT,
         }
         domain = await self._async_get_domain()
-        async with aiohttp.ClientSession(json_serialize=dumps) as session:
-            async with session.post(
-                BASE_UAA_URL + domain + "/login",
-                json=body,
-                headers=headers,
-            ) as resp:
-                response = await resp.json()
+        async with self._get_http_session().post(
+            BASE_UAA_URL + domain + "/login",
+            json=body,
+            headers=headers,
+        ) as resp:
+            response = await resp.json()
 
         response["last_login"] = datetime.now()
 
+        self._credentials = (username, password)
         self._session_cache = ElroConnectsCloudSessionCache(**response)
 
+    async def async_refresh_token(self) -> None:
+        """Obtain a new bearer token with the refresh token.
+
+        Falls back to a login if the refresh token is not accepted.
+        """
+        if self._session_cache is None:
+            raise ValueError("Cannot refresh the token, no valid session")
+        body = {
+            "pid": PID,
+            "clientType": CLIENT_TYPE,
+            "refresh_token": self._session_cache["refresh_token"],
+        }
+        headers = {
+            "User-Agent": USER_AGENT,
+        }
+        domain = await self._async_get_domain()
+        async with self._get_http_session().post(
+            BASE_UAA_URL + domain + "/token/refresh",
+            json=body,
+            headers=headers,
+        ) as resp:
+            response = await resp.json()
+
+        if isinstance(response, dict) and "access_token" in response:
+            response["last_login"] = datetime.now()
+            self._session_cache = ElroConnectsCloudSessionCache(
+                **{**self._session_cache, **response}
+            )
+            return
+        if self._credentials is None:
+            raise ValueError("Cannot refresh the token, login again")
+        _LOGGER.debug("Token refresh failed, logging in again")
+        await self.async_login(*self._credentials)
+
+    async def _async_ensure_token(self) -> None:
+        """Refresh the bearer token before it expires."""
+        async with self._token_lock:
+            if self._session_cache is None:
+                raise ValueError("Cannot get connector list, no valid session")
+            refresh_at = self.token_expires - timedelta(seconds=TOKEN_REFRESH_MARGIN)
+            if datetime.now() >= refresh_at:
+                await self.async_refresh_token()
+
+    @property
+    def token_expires(self) -> datetime | None:
+        """Return when the bearer token expires."""
+        if self._session_cache is None:
+            return None
+        return self._session_cache["last_login"] + timedelta(
+            seconds=self._session_cache["expires_in"]
+        )
+
     @property
     def session(self) -> ElroConnectsCloudSessionCache | None:
         """Return the current session."""
@@ -91,65 +198,26 @@ class ElroConnectsSession:
 
     async def _async_get_domain(self) -> str:
         """Return the API main domain name address."""
-
-        def _get_domain() -> str | None:
-            # domain has not been determined
-            sckt = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            host = "info.hekr.me"
-            port = 91
-            sckt.connect((host, port))
-            message = '{"action":"getAppDomain"}\n'
-            sckt.send(message.encode())
-            msg = sckt.recv(1024)
-
-            try:
-                parsed_data = json.loads(msg)
-                _LOGGER.debug(
-                    "%s result code: %s description: %s",
-                    host,
-                    parsed_data["code"],
-                    parsed_data["desc"],
-                )
-
-                if "dcInfo" in parsed_data:
-                    self._domain = parsed_data["dcInfo"]["domain"]
-            except json.decoder.JSONDecodeError:
-                return DEFAULT_DOMAIN
-
-            if not self._domain.startswith("hekr"):  # default
-                self._domain = None
-                return DEFAULT_DOMAIN
-
-            return self._domain
-
-        # Only run once
-        if self._domain:
-            return self._domain
-
-        loop = asyncio.get_event_loop()
-        if domain := await loop.run_in_executor(None, _get_domain):
-            self._domain = domain
-        return domain
+        self._domain = await async_get_app_domain(cache_file=self._domain_cache_file)
+        return self._domain
 
     async def async_get_connectors(self) -> list[ElroConnectsConnector]:
         """Return as list of registered connectors."""
 
-        if self._session_cache is None:
-            raise ValueError("Cannot get connector list, no valid session")
+        await self._async_ensure_token()
 
         # Get the list
         headers = {
-            "User-Agent": "lib-elro-connects",
+            "User-Agent": USER_AGENT,
             "Authorization": f"Bearer {self._session_cache['access_token']}",
         }
 
         domain = await self._async_get_domain()
-        async with aiohttp.ClientSession(json_serialize=dumps) as session:
-            async with session.get(
-                BASE_USER_URL + domain + "/device",
-                headers=headers,
-            ) as resp:
-                response = await resp.json()
+        async with self._get_http_session().get(
+            BASE_USER_URL + domain + "/device",
+            headers=headers,
+        ) as resp:
+            response = await resp.json()
         connector_list = [
             ElroConnectsConnector(
                 dev_id=connector["devTid"],
@@ -161,8 +229,108 @@ class ElroConnectsSession:
                 sw_version=connector["binVersion"],
                 model=connector["model"],
                 online=connector["online"],
+                ip=_get_connector_ip(connector),
             )
             for connector in response
         ]
 
         return connector_list
+
+
+def _get_connector_ip(connector: dict) -> str | None:
+    """Return the LAN IP address of a connector, if known."""
+    if lan_ip := connector.get("lanIp"):
+        return lan_ip
+    # The geo IP is usually the public WAN address, only a private one is local
+    gis_ip = ((connector.get("gis") or {}).get("ip") or {}).get("ip")
+    try:
+        if gis_ip and ipaddress.ip_address(gis_ip).is_private:
+            return gis_ip
+    except ValueError:
+        pass
+    return None
+
+
+def _read_domain_cache(cache_file: str, key: tuple[str, int]) -> None:
+    """Load a persisted domain into the cache."""
+    try:
+        with open(cache_file, encoding="utf-8") as file:
+            data = json.load(file)
+        if data["host"] == key[0] and data["port"] == key[1]:
+            _DOMAIN_CACHE[key] = (data["domain"], float(data["expires"]))
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        _LOGGER.debug("Cannot read domain cache %s: %s", cache_file, err)
+
+
+def _write_domain_cache(cache_file: str, key: tuple[str, int]) -> None:
+    """Persist the cached domain."""
+    domain, expires = _DOMAIN_CACHE[key]
+    data = {"host": key[0], "port": key[1], "domain": domain, "expires": expires}
+    try:
+        with open(cache_file, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+    except OSError as err:
+        _LOGGER.debug("Cannot write domain cache %s: %s", cache_file, err)
+
+
+async def _async_query_domain(host: str, port: int, timeout: float) -> str | None:
+    """Query the API main domain, returns None if the lookup failed."""
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+        writer.write(b'{"action":"getAppDomain"}\n')
+        await writer.drain()
+        # The answer is terminated by a newline or by closing the connection
+        msg = await asyncio.wait_for(reader.readline(), timeout)
+        parsed_data = json.loads(msg)
+    except (OSError, asyncio.TimeoutError, ValueError) as err:
+        _LOGGER.debug("Domain lookup at %s:%s failed: %s", host, port, err)
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+
+    _LOGGER.debug(
+        "%s result code: %s description: %s",
+        host,
+        parsed_data.get("code"),
+        parsed_data.get("desc"),
+    )
+    try:
+        domain = parsed_data["dcInfo"]["domain"]
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(domain, str) or not domain.startswith("hekr"):
+        return None
+    return domain
+
+
+async def async_get_app_domain(
+    host: str = DOMAIN_HOST,
+    port: int = DOMAIN_PORT,
+    timeout: float = DOMAIN_TIMEOUT,
+    cache_file: str | None = None,
+) -> str:
+    """Return the API main domain name, cached process wide.
+
+    If cache_file is set the domain is persisted and reused after a restart.
+    The default domain is returned if the lookup fails.
+    """
+    key = (host, port)
+    loop = asyncio.get_running_loop()
+    if key not in _DOMAIN_CACHE and cache_file:
+        await loop.run_in_executor(None, _read_domain_cache, cache_file, key)
+    if (cached := _DOMAIN_CACHE.get(key)) and cached[1] > time.time():
+        return cached[0]
+
+    if (domain := await _async_query_domain(host, port, timeout)) is None:
+        _DOMAIN_CACHE[key] = (DEFAULT_DOMAIN, time.time() + DOMAIN_RETRY_TTL)
+        return DEFAULT_DOMAIN
+    _DOMAIN_CACHE[key] = (domain, time.time() + DOMAIN_CACHE_TTL)
+    if cache_file:
+        await loop.run_in_executor(None, _write_domain_cache, cache_file, key)
+    return domain
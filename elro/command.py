@@ -15,6 +15,7 @@ COUNT = "count"
 ACK_APP = "APP_answer_OK"
 
 SCENE_SYNC_FINISHED = "OVER"
+STATUS_SYNC_FINISHED = "OVER"
 NAME_SYNC_FINISHED = "NAME_OVER"
 
 CMD_CONNECT = "IOT_KEY?"
@@ -68,6 +69,17 @@ class Command(Enum):
     SENCE_GROUP = 28
 
 
+# Queries that can be sent again when the reply is lost
+IDEMPOTENT_COMMANDS = frozenset(
+    {
+        Command.GET_DEVICE_NAME,
+        Command.GET_ALL_EQUIPMENT_STATUS,
+        Command.SYN_DEVICE_STATUS,
+        Command.SYN_SCENE,
+    }
+)
+
+
 class CommandAttributes(TypedDict):
     """Base class for building command attributes for elro.api.async_process_command."""
 
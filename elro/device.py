@@ -1,6 +1,10 @@
 """Elro device class models."""
 
+from __future__ import annotations
+
+from collections.abc import Mapping
 from enum import Enum
+from typing import Any, Iterator
 
 
 class DeviceType(Enum):
@@ -107,4 +111,129 @@ DEVICE_STATE = {
 DEVICE_VALUE = {
     0: DEVICE_VALUE_OFF,
     1: DEVICE_VALUE_ON,
-}
\ No newline at end of file
+}
+# Keys of the dict view of a device state
+DEVICE_STATE_KEYS = (
+    "device_type",
+    "signal",
+    "battery",
+    "device_state",
+    "device_value",
+    "device_status_data",
+    "device_value_data",
+)
+
+
+class DeviceState(Mapping):
+    """Parsed state of a device.
+
+    The record is read only, so unchanged devices can share the same object
+    between updates and hubs.
+    It is a mapping with the keys of the original state dict for compatibility,
+    the name is only included when it is known.
+    """
+
+    __slots__ = (
+        "device_id",
+        "device_name",
+        "device_status",
+        "device_type",
+        "signal",
+        "battery",
+        "device_state",
+        "device_value",
+        "device_value_data",
+        "name",
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        device_id: int,
+        device_name: str,
+        device_status: str,
+        device_type: str,
+        signal: int,
+        battery: int,
+        device_state: str,
+        device_value: str,
+        device_value_data: int,
+        name: str | None = None,
+    ) -> None:
+        """Initialize the record."""
+        for key, value in zip(
+            self.__slots__,
+            (
+                device_id,
+                device_name,
+                device_status,
+                device_type,
+                signal,
+                battery,
+                device_state,
+                device_value,
+                device_value_data,
+                name,
+            ),
+        ):
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        """Refuse to change the shared record."""
+        raise AttributeError(f"{self.__class__.__name__} is read only")
+
+    def __delattr__(self, key: str) -> None:
+        """Refuse to change the shared record."""
+        raise AttributeError(f"{self.__class__.__name__} is read only")
+
+    def __reduce__(self) -> tuple[type, tuple[Any, ...]]:
+        """Copy and pickle the record through the constructor."""
+        return self.__class__, tuple(getattr(self, key) for key in self.__slots__)
+
+    @property
+    def device_status_data(self) -> dict[str, Any]:
+        """Return the status data the state was parsed from."""
+        return {
+            "device_ID": self.device_id,
+            "device_name": self.device_name,
+            "device_status": self.device_status,
+        }
+
+    def same_status(self, other: DeviceState) -> bool:
+        """Return True if other was parsed from the same status data."""
+        return (
+            self.device_status == other.device_status
+            and self.device_name == other.device_name
+            and self.device_id == other.device_id
+        )
+
+    def with_name(self, name: str | None) -> DeviceState:
+        """Return the record with the name of the device."""
+        if name == self.name:
+            return self
+        return self.__class__(
+            *(getattr(self, key) for key in self.__slots__[:-1]), name
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state in the original dict shape."""
+        return dict(self.items())
+
+    def __getitem__(self, key: str) -> Any:
+        """Return a value of the dict view."""
+        if key in DEVICE_STATE_KEYS or (key == "name" and self.name is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the keys of the dict view."""
+        yield from DEVICE_STATE_KEYS
+        if self.name is not None:
+            yield "name"
+
+    def __len__(self) -> int:
+        """Return the number of keys of the dict view."""
+        return len(DEVICE_STATE_KEYS) + (self.name is not None)
+
+    def __repr__(self) -> str:
+        """Return the representation of the record."""
+        return f"{self.__class__.__name__}({self.as_dict()!r})"
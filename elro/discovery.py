@@ -0,0 +1,148 @@
+"""Discover Elro Connects K1 connectors on the local network."""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import socket
+from dataclasses import dataclass
+from typing import Iterable
+
+from elro.command import CMD_CONNECT
+
+DISCOVERY_PORT = 1025
+BROADCAST_ADDRESS = "255.255.255.255"
+PROBE_TIME_OUT = 1.0
+MAX_IN_FLIGHT = 64
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DiscoveredConnector:
+    """A K1 connector that answered the handshake."""
+
+    connector_id: str
+    host: str
+    port: int
+    bind_key: str | None = None
+    api_key: str | None = None
+
+
+def parse_handshake_reply(
+    data: bytes, addr: tuple[str, int]
+) -> DiscoveredConnector | None:
+    """Return the connector of a handshake reply, None for other data."""
+    if not data.startswith(b"NAME:"):
+        return None
+    session = {}
+    for line in data.decode("utf-8", "replace").strip().split("\n"):
+        key, _, value = line.strip().partition(":")
+        session[key] = value
+    if not session.get("NAME"):
+        return None
+    return DiscoveredConnector(
+        session["NAME"], addr[0], addr[1], session.get("BIND"), session.get("KEY")
+    )
+
+
+class K1DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Collects the handshake replies to the discovery probes."""
+
+    def __init__(self) -> None:
+        """Initialize the protocol."""
+        self.connectors: dict[str, DiscoveredConnector] = {}
+        self.transport: asyncio.DatagramTransport | None = None
+        self._waiters: dict[str, asyncio.Future[DiscoveredConnector]] = {}
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        """Store the transport."""
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Store a connector and wake up the probe of its host."""
+        if (connector := parse_handshake_reply(data, addr)) is None:
+            return
+        if connector.connector_id not in self.connectors:
+            _LOGGER.debug("Discovered %s at %s", connector.connector_id, addr[0])
+        self.connectors[connector.connector_id] = connector
+        host = str(ipaddress.ip_address(addr[0]))
+        if (waiter := self._waiters.pop(host, None)) and not waiter.done():
+            waiter.set_result(connector)
+
+    def error_received(self, exc: Exception) -> None:
+        """Ignore unreachable hosts."""
+        _LOGGER.debug("Discovery error: %s", exc)
+
+    async def async_probe(
+        self, host: str, port: int, payload: bytes, timeout: float
+    ) -> DiscoveredConnector | None:
+        """Send a probe to a host and wait for its reply."""
+        loop = asyncio.get_running_loop()
+        try:
+            # Replies are matched by the address they come from
+            host = await _async_resolve_host(host, port)
+        except OSError as err:
+            _LOGGER.debug("Cannot resolve %s: %s", host, err)
+            return None
+        waiter = loop.create_future()
+        self._waiters[host] = waiter
+        try:
+            self.transport.sendto(payload, (host, port))
+            return await asyncio.wait_for(waiter, timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            if self._waiters.get(host) is waiter:
+                del self._waiters[host]
+
+
+async def _async_resolve_host(host: str, port: int) -> str:
+    """Return the IPv4 address of a host in the format of a reply address."""
+    try:
+        return str(ipaddress.ip_address(host))
+    except ValueError:
+        pass
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM
+    )
+    return str(ipaddress.ip_address(infos[0][4][0]))
+
+
+async def async_discover_connectors(
+    hosts: str | Iterable[str] | None = None,
+    k1_id: str = "",
+    port: int = DISCOVERY_PORT,
+    timeout: float = PROBE_TIME_OUT,
+    max_in_flight: int = MAX_IN_FLIGHT,
+) -> dict[str, DiscoveredConnector]:
+    """Return the connectors that answer the IOT_KEY? handshake by connector id.
+
+    hosts is a network like "192.168.1.0/24" or a list of addresses to sweep,
+    at most max_in_flight hosts are probed at a time. Without hosts the probe
+    is broadcast and replies are collected for timeout seconds.
+    """
+    if isinstance(hosts, str):
+        network = ipaddress.ip_network(hosts, strict=False)
+        hosts = (str(host) for host in network.hosts())
+    payload = (CMD_CONNECT + k1_id).encode("utf-8")
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        K1DiscoveryProtocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+    )
+    try:
+        if hosts is None:
+            transport.sendto(payload, (BROADCAST_ADDRESS, port))
+            await asyncio.sleep(timeout)
+        else:
+            pending = iter(hosts)
+
+            async def _async_sweep() -> None:
+                for host in pending:
+                    await protocol.async_probe(host, port, payload, timeout)
+
+            await asyncio.gather(*(_async_sweep() for _ in range(max_in_flight)))
+    finally:
+        transport.close()
+    return dict(protocol.connectors)
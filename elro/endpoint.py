@@ -0,0 +1,173 @@
+"""Shared UDP endpoint for many Elro Connects K1 hubs."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+from typing import Any, Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def get_dev_tid(data: bytes) -> str | None:
+    """Return the connector id of a handshake reply or a JSON frame."""
+    if data.startswith(b"NAME:"):
+        return data[5:].split(b"\n", 1)[0].strip().decode("utf-8", "replace")
+    if (index := data.find(b'"devTid"')) < 0:
+        return None
+    start = data.find(b'"', data.find(b":", index)) + 1
+    end = data.find(b'"', start)
+    return data[start:end].decode("utf-8", "replace") if start and end > 0 else None
+
+
+class K1SharedTransport:
+    """Datagram transport of a single hub on a shared endpoint."""
+
+    def __init__(
+        self,
+        endpoint: K1SharedEndpoint,
+        remote_addr: tuple[str, int],
+        k1_id: str,
+        protocol: Any,
+    ) -> None:
+        """Initialize the transport."""
+        self._endpoint = endpoint
+        self._closing = False
+        self.remote_addr = remote_addr
+        self.k1_id = k1_id
+        self.protocol = protocol
+
+    def sendto(self, data: bytes, addr: Any = None) -> None:
+        """Send a datagram to the hub."""
+        self._endpoint.sendto(data, addr or self.remote_addr)
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        """Return the extra info of the shared socket."""
+        if name == "peername":
+            return self.remote_addr
+        return self._endpoint.get_extra_info(name, default)
+
+    def is_closing(self) -> bool:
+        """Return True if the transport is closed."""
+        return self._closing
+
+    def close(self) -> None:
+        """Stop routing datagrams to this hub, the shared socket stays open."""
+        if self._closing:
+            return
+        self._closing = True
+        self._endpoint.unregister(self)
+        self.protocol.connection_lost(None)
+
+
+class K1SharedEndpoint(asyncio.DatagramProtocol):
+    """One unconnected UDP socket shared by many K1 hubs.
+
+    Inbound datagrams are routed by source address, and by the devTid
+    when more hubs share the same address.
+    """
+
+    def __init__(self, local_addr: tuple[str, int] = ("0.0.0.0", 0)) -> None:
+        """Initialize the endpoint."""
+        self._local_addr = local_addr
+        self._transport: asyncio.DatagramTransport | None = None
+        # Hubs connecting at the same time wait for the first one to open
+        self._open_lock = asyncio.Lock()
+        self._routes: dict[tuple[str, int], dict[str, K1SharedTransport]] = {}
+        self.unrouted = 0
+
+    async def async_open(self) -> None:
+        """Open the shared socket if it is not open."""
+        async with self._open_lock:
+            if self._transport is not None:
+                return
+            loop = asyncio.get_running_loop()
+            await loop.create_datagram_endpoint(
+                lambda: self, local_addr=self._local_addr, family=socket.AF_INET
+            )
+
+    def close(self) -> None:
+        """Close the shared socket and all hub transports."""
+        if self._transport is not None:
+            self._transport.close()
+
+    async def async_create_endpoint(
+        self,
+        protocol_factory: Callable[[], Any],
+        remote_addr: tuple[str, int],
+        k1_id: str,
+    ) -> tuple[K1SharedTransport, Any]:
+        """Return a transport and protocol for a hub, like create_datagram_endpoint."""
+        await self.async_open()
+        loop = asyncio.get_running_loop()
+        # Datagrams are routed by the resolved source address
+        address_info = await loop.getaddrinfo(
+            *remote_addr, family=socket.AF_INET, type=socket.SOCK_DGRAM
+        )
+        address = address_info[0][4]
+        protocol = protocol_factory()
+        transport = K1SharedTransport(self, address, k1_id, protocol)
+        self._routes.setdefault(address, {})[k1_id] = transport
+        protocol.connection_made(transport)
+        return transport, protocol
+
+    def unregister(self, transport: K1SharedTransport) -> None:
+        """Stop routing datagrams to a hub transport."""
+        routes = self._routes.get(transport.remote_addr, {})
+        if routes.get(transport.k1_id) is transport:
+            del routes[transport.k1_id]
+        if not routes:
+            self._routes.pop(transport.remote_addr, None)
+
+    def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Send a datagram over the shared socket."""
+        if self._transport is None:
+            raise ConnectionError("Shared endpoint is not open")
+        self._transport.sendto(data, addr)
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        """Return the extra info of the shared socket."""
+        if self._transport is None:
+            return default
+        return self._transport.get_extra_info(name, default)
+
+    @property
+    def hub_count(self) -> int:
+        """Return the number of hubs using the endpoint."""
+        return sum(len(routes) for routes in self._routes.values())
+
+    def connection_made(self, transport):
+        """Connection made."""
+        self._transport = transport
+
+    def datagram_received(self, data, addr):
+        """Route a datagram to the hub it was sent by."""
+        if not (routes := self._routes.get(addr)):
+            self.unrouted += 1
+            _LOGGER.debug("Ignoring datagram from unknown hub %s", addr)
+            return
+        if len(routes) == 1:
+            targets = list(routes.values())
+        elif (dev_tid := get_dev_tid(data)) is None:
+            # Frames without devTid, like acknowledgements, go to all hubs
+            targets = list(routes.values())
+        elif (transport := routes.get(dev_tid)) is not None:
+            targets = [transport]
+        else:
+            self.unrouted += 1
+            _LOGGER.debug("Ignoring datagram from unknown hub %s at %s", dev_tid, addr)
+            return
+        for transport in targets:
+            transport.protocol.datagram_received(data, addr)
+
+    def error_received(self, exc):
+        """Error received."""
+        _LOGGER.debug("Shared endpoint error received: %s", exc)
+
+    def connection_lost(self, exc):
+        """Close all hub transports when the shared socket is lost."""
+        self._transport = None
+        for routes in list(self._routes.values()):
+            for transport in list(routes.values()):
+                transport.close()
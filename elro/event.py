@@ -0,0 +1,48 @@
+"""Events pushed by the Elro Connects K1 hub."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from elro.command import Command, STATUS_SYNC_FINISHED
+from elro.device import DeviceState
+from elro.utils import (
+    check_alarm_trigger_crc,
+    get_alarm_trigger_data,
+    get_device_states,
+)
+
+
+@dataclass
+class K1Event:
+    """An event pushed by the K1 hub."""
+
+    command: Command
+    data: dict[str, Any]
+    device_id: int | None = None
+    state: DeviceState | None = None
+
+
+def parse_event(command: Command, data: dict[str, Any]) -> K1Event | None:
+    """Parse the data of a pushed frame, returns None for a sync finished marker.
+
+    Raises ValueError if the CRC of an alarm does not match.
+    """
+    if command == Command.DEVICE_ALARM_TRIGGER:
+        if not check_alarm_trigger_crc(data["answer_content"]):
+            raise ValueError(f"Invalid alarm CRC: {data['answer_content']}")
+        hexdata = get_alarm_trigger_data(data["answer_content"])
+    elif command == Command.DEVICE_STATUS_UPDATE:
+        if data.get("device_status") == STATUS_SYNC_FINISHED:
+            return None
+        hexdata = data
+    else:
+        return K1Event(command=command, data=data)
+    device_id = hexdata["device_ID"]
+    return K1Event(
+        command=command,
+        data=data,
+        device_id=device_id,
+        state=get_device_states([hexdata]).get(device_id),
+    )
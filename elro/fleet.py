@@ -0,0 +1,188 @@
+"""Poll a fleet of Elro Connects K1 hubs."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from elro.api import K1, INTERVAL
+
+MAX_CONCURRENT_POLLS = 10
+POLL_TIME_OUT = 15
+JITTER = 0.1
+MAX_BACKOFF_FACTOR = 32
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class HubStatistics:
+    """Poll latency and error statistics of a hub."""
+
+    polls: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    last_error: str | None = None
+    last_latency: float | None = None
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+
+    @property
+    def average_latency(self) -> float | None:
+        """Return the average latency of the successful polls."""
+        return self.total_latency / self.polls if self.polls else None
+
+
+class K1Fleet:
+    """Poll K1 hubs with jitter and a global concurrency cap.
+
+    Failing hubs are backed off exponentially and every poll has a time out,
+    so a dead hub cannot starve the other hubs.
+    """
+
+    def __init__(
+        self,
+        interval: float = INTERVAL,
+        max_concurrent: int = MAX_CONCURRENT_POLLS,
+        poll_timeout: float = POLL_TIME_OUT,
+        jitter: float = JITTER,
+        poll: Callable[[K1], Awaitable[Any]] | None = None,
+        on_update: Callable[[str, Any], None] | None = None,
+    ) -> None:
+        """Initialize the fleet."""
+        self._interval = interval
+        self._max_concurrent = max_concurrent
+        self._poll_timeout = poll_timeout
+        self._jitter = jitter
+        self._poll = poll or K1.async_sync_device_status
+        self._on_update = on_update
+        self._hubs: dict[str, K1] = {}
+        self._statistics: dict[str, HubStatistics] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def hubs(self) -> dict[str, K1]:
+        """Return the hubs by their id."""
+        return self._hubs
+
+    @property
+    def statistics(self) -> dict[str, HubStatistics]:
+        """Return the statistics by hub id."""
+        return self._statistics
+
+    @property
+    def aggregate_statistics(self) -> dict[str, Any]:
+        """Return the statistics over all hubs."""
+        polls = sum(stats.polls for stats in self._statistics.values())
+        total_latency = sum(stats.total_latency for stats in self._statistics.values())
+        return {
+            "hubs": len(self._hubs),
+            "polls": polls,
+            "errors": sum(stats.errors for stats in self._statistics.values()),
+            "failing_hubs": sum(
+                1 for stats in self._statistics.values() if stats.consecutive_errors
+            ),
+            "average_latency": total_latency / polls if polls else None,
+            "max_latency": max(
+                (stats.max_latency for stats in self._statistics.values()), default=0.0
+            ),
+        }
+
+    def add_hub(self, hub_id: str, hub: K1) -> None:
+        """Add a hub, it is polled once the fleet is started."""
+        if hub_id in self._hubs:
+            raise ValueError(f"Hub {hub_id} is already added, remove it first")
+        self._hubs[hub_id] = hub
+        self._statistics[hub_id] = HubStatistics()
+        if self._semaphore is not None:
+            self._start_polling(hub_id)
+
+    async def async_remove_hub(self, hub_id: str) -> None:
+        """Stop polling and disconnect a hub."""
+        await self._async_stop_polling(hub_id)
+        del self._statistics[hub_id]
+        await self._hubs.pop(hub_id).async_disconnect()
+
+    async def async_start(self) -> None:
+        """Start polling all hubs."""
+        self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        for hub_id in self._hubs:
+            self._start_polling(hub_id)
+
+    async def async_stop(self) -> None:
+        """Stop polling and disconnect all hubs."""
+        for hub_id in list(self._tasks):
+            await self._async_stop_polling(hub_id)
+        self._semaphore = None
+        await asyncio.gather(
+            *(hub.async_disconnect() for hub in self._hubs.values()),
+            return_exceptions=True,
+        )
+
+    def _start_polling(self, hub_id: str) -> None:
+        """Start the poll loop of a hub."""
+        self._tasks[hub_id] = asyncio.get_running_loop().create_task(
+            self._async_poll_loop(hub_id)
+        )
+
+    async def _async_stop_polling(self, hub_id: str) -> None:
+        """Cancel the poll loop of a hub."""
+        if (task := self._tasks.pop(hub_id, None)) is None:
+            return
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _async_poll_loop(self, hub_id: str) -> None:
+        """Poll a hub, spreading the polls over the interval."""
+        hub = self._hubs[hub_id]
+        stats = self._statistics[hub_id]
+        # Spread the first polls so the hubs are not polled in lock step
+        await asyncio.sleep(random.uniform(0, self._interval))
+        while True:
+            async with self._semaphore:
+                await self._async_poll(hub_id, hub, stats)
+            backoff = min(2**stats.consecutive_errors, MAX_BACKOFF_FACTOR)
+            await asyncio.sleep(
+                self._interval
+                * backoff
+                * random.uniform(1 - self._jitter, 1 + self._jitter)
+            )
+
+    async def _async_poll(self, hub_id: str, hub: K1, stats: HubStatistics) -> None:
+        """Poll a hub once and update its statistics."""
+        start = time.monotonic()
+        # asyncio.wait does not swallow a cancellation of the poll loop
+        # like wait_for can when the time out and the cancellation coincide
+        poll = asyncio.ensure_future(self._poll(hub))
+        try:
+            await asyncio.wait((poll,), timeout=self._poll_timeout)
+            if not poll.done():
+                raise asyncio.TimeoutError
+            result = poll.result()
+        except Exception as error:  # pylint: disable=broad-except
+            stats.errors += 1
+            stats.consecutive_errors += 1
+            stats.last_error = str(error) or type(error).__name__
+            _LOGGER.debug("Poll of hub %s failed: %s", hub_id, stats.last_error)
+            return
+        finally:
+            poll.cancel()
+        latency = time.monotonic() - start
+        stats.polls += 1
+        stats.consecutive_errors = 0
+        stats.last_latency = latency
+        stats.max_latency = max(stats.max_latency, latency)
+        stats.total_latency += latency
+        if self._on_update:
+            try:
+                self._on_update(hub_id, result)
+            except Exception:  # pylint: disable=broad-except
+                # A failing callback must not end the polling of the hub
+                _LOGGER.exception("Error in the update callback of hub %s", hub_id)
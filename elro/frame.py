@@ -0,0 +1,138 @@
+"""Frame parser for the Elro Connects K1 hub."""
+
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable
+
+try:
+    import orjson
+
+    json_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:  # pragma: no cover
+    try:
+        import ujson
+
+        json_loads = ujson.loads
+    except ImportError:
+        json_loads = json.loads
+
+ACK_FRAME = b"{st_answer_ok}"
+# Templates kept per session, the least recently used template is dropped
+FRAME_TEMPLATE_CACHE_SIZE = 64
+
+
+class FrameType(Enum):
+    """Frame types received from the hub."""
+
+    ACK = "ack"
+    JSON = "json"
+    TRUNCATED = "truncated"
+    INVALID = "invalid"
+
+
+def classify_frame(data: bytes) -> tuple[FrameType, bytes]:
+    """Return the type of a frame and the frame stripped from whitespace."""
+    data = data.strip()
+    if len(data) == len(ACK_FRAME) and data.lower() == ACK_FRAME:
+        return FrameType.ACK, data
+    if not data.startswith(b"{"):
+        return FrameType.INVALID, data
+    if data.count(b"{") > data.count(b"}"):
+        return FrameType.TRUNCATED, data
+    return FrameType.JSON, data
+
+
+def parse_frame(data: bytes) -> tuple[FrameType, dict[str, Any] | None]:
+    """Parse a frame, truncated frames are repaired before they are parsed.
+
+    The hub sometimes leaves out the closing brackets of a status frame.
+    A ValueError is raised if the frame is not valid JSON.
+    """
+    frame_type, data = classify_frame(data)
+    if frame_type == FrameType.ACK:
+        return frame_type, None
+    if frame_type == FrameType.TRUNCATED:
+        data += b"}" * (data.count(b"{") - data.count(b"}"))
+    elif frame_type == FrameType.INVALID:
+        raise ValueError(f"Invalid frame {data!r}")
+    frame = json_loads(data)
+    if not isinstance(frame, dict):
+        raise ValueError(f"Invalid frame {data!r}")
+    return frame_type, frame
+
+
+def _render_value(value: Any) -> bytes:
+    """Return the JSON representation of an argument like json.dumps."""
+    if type(value) is int:  # pylint: disable=unidiomatic-typecheck
+        return str(value).encode()
+    if type(value) is str and value.isascii() and value.isalnum():  # pylint: disable=unidiomatic-typecheck
+        return b'"' + value.encode() + b'"'
+    return json.dumps(value).encode("utf-8")
+
+
+class FrameBuilder:
+    """Outbound frames of a session, built from pre-rendered templates.
+
+    The envelope and the constant command attributes are rendered once per
+    session and command, building a frame only renders the msgId and the
+    arguments. Frames are byte for byte equal to json.dumps of the command.
+    """
+
+    def __init__(self, dev_tid: str, ctrl_key: str) -> None:
+        """Initialize the builder for a session."""
+        self.session = (dev_tid, ctrl_key)
+        self._envelope = (
+            ', "action": "appSend", "params": {'
+            f'"devTid": {json.dumps(dev_tid)}, "ctrlKey": {json.dumps(ctrl_key)}, '
+            '"appTid": 1, "data": {'
+        )
+        self._templates: OrderedDict[
+            tuple[int, int, tuple[str, ...]],
+            tuple[dict[str, Any], tuple[bytes, ...], tuple[str, ...]],
+        ] = OrderedDict()
+
+    def _render_template(
+        self, cmd_id: int, attributes: dict[str, Any], keys: tuple[str, ...]
+    ) -> tuple[tuple[bytes, ...], tuple[str, ...]]:
+        """Render the constant parts of a command, the arguments are slots."""
+        data = {"cmdId": cmd_id, **attributes, **dict.fromkeys(keys)}
+        parts: list[bytes] = []
+        slots: list[str] = []
+        part = self._envelope
+        for index, (key, value) in enumerate(data.items()):
+            part += f'{", " if index else ""}{json.dumps(key)}: '
+            if key in keys:
+                parts.append(part.encode("utf-8"))
+                slots.append(key)
+                part = ""
+            else:
+                part += json.dumps(value)
+        parts.append(f"{part}}}}}}}".encode("utf-8"))
+        return tuple(parts), tuple(slots)
+
+    def build(
+        self,
+        msg_id: int,
+        cmd_id: int,
+        attributes: dict[str, Any],
+        argv: dict[str, Any],
+    ) -> bytes:
+        """Return the frame of a command with attributes updated by argv."""
+        keys = tuple(argv)
+        template_key = (cmd_id, id(attributes), keys)
+        template = self._templates.get(template_key)
+        if template is None or template[0] is not attributes:
+            template = (attributes, *self._render_template(cmd_id, attributes, keys))
+            self._templates[template_key] = template
+            if len(self._templates) > FRAME_TEMPLATE_CACHE_SIZE:
+                self._templates.popitem(last=False)
+        self._templates.move_to_end(template_key)
+        _, parts, slots = template
+        frame = [b'{"msgId": ', str(msg_id).encode(), parts[0]]
+        for key, part in zip(slots, parts[1:]):
+            frame.append(_render_value(argv[key]))
+            frame.append(part)
+        return b"".join(frame)
@@ -0,0 +1,160 @@
+"""Instrumentation of the Elro Connects K1 hub connection."""
+
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FRAME_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+METRIC_LATENCY = "latency"
+METRIC_FRAMES = "frames"
+METRIC_TIMEOUTS = "timeouts"
+METRIC_ACKS = "acks"
+METRIC_ACKS_RECEIVED = "acks_received"
+METRIC_RECONNECTS = "reconnects"
+METRIC_REPAIRS = "repairs"
+
+# Name, type and help text of the Prometheus exposition per metric
+PROMETHEUS_METRICS = {
+    METRIC_LATENCY: (
+        "elro_command_latency_seconds",
+        "histogram",
+        "Round trip latency of the commands.",
+    ),
+    METRIC_FRAMES: (
+        "elro_command_frames",
+        "histogram",
+        "Frames received per command response.",
+    ),
+    METRIC_TIMEOUTS: (
+        "elro_command_timeouts_total",
+        "counter",
+        "Time outs waiting for a reply.",
+    ),
+    METRIC_ACKS: ("elro_acks_sent_total", "counter", "Frames acknowledged to the hub."),
+    METRIC_ACKS_RECEIVED: (
+        "elro_acks_received_total",
+        "counter",
+        "Acknowledgements received from the hub.",
+    ),
+    METRIC_RECONNECTS: (
+        "elro_reconnects_total",
+        "counter",
+        "Handshakes after the first connection.",
+    ),
+    METRIC_REPAIRS: (
+        "elro_repaired_frames_total",
+        "counter",
+        "Truncated frames that were repaired.",
+    ),
+}
+
+MetricSink = Callable[[str, "str | None", float], None]
+
+
+@dataclass
+class Histogram:
+    """Cumulative histogram of observed values."""
+
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        """Initialize a count per bucket and one for +Inf."""
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return the cumulative count per upper bound."""
+        result = []
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+
+class K1Metrics:
+    """Counters and histograms per command type of a hub.
+
+    Every observation is passed to the sinks as (metric, command, value),
+    command is None for metrics of the connection.
+    """
+
+    def __init__(self, hub_id: str) -> None:
+        """Initialize the metrics."""
+        self.hub_id = hub_id
+        self.counters: dict[tuple[str, str | None], int] = {}
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self._sinks: list[MetricSink] = []
+
+    def add_sink(self, sink: MetricSink) -> Callable[[], None]:
+        """Add a sink, returns a callable to remove it."""
+        self._sinks.append(sink)
+        return lambda: self._sinks.remove(sink)
+
+    def count(self, metric: str, command: str | None = None) -> None:
+        """Increment a counter."""
+        key = (metric, command)
+        self.counters[key] = self.counters.get(key, 0) + 1
+        for sink in self._sinks:
+            sink(metric, command, 1)
+
+    def observe_command(self, command: str, latency: float, frames: int) -> None:
+        """Add the latency and number of frames of a command response."""
+        for metric, buckets, value in (
+            (METRIC_LATENCY, LATENCY_BUCKETS, latency),
+            (METRIC_FRAMES, FRAME_BUCKETS, frames),
+        ):
+            if (histogram := self.histograms.get((metric, command))) is None:
+                histogram = self.histograms[(metric, command)] = Histogram(buckets)
+            histogram.observe(value)
+            for sink in self._sinks:
+                sink(metric, command, value)
+
+    def prometheus_text(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        return render_prometheus((self,))
+
+
+def _labels(hub_id: str, command: str | None, **extra: str) -> str:
+    """Return the label set of a sample."""
+    labels = {"hub": hub_id, **({"command": command} if command else {}), **extra}
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render_prometheus(metrics: Iterable[K1Metrics]) -> str:
+    """Return the metrics of hubs in the Prometheus text exposition format."""
+    samples: dict[str, list[str]] = {metric: [] for metric in PROMETHEUS_METRICS}
+    for hub in metrics:
+        for (metric, command), value in sorted(
+            hub.counters.items(), key=lambda item: (item[0][0], item[0][1] or "")
+        ):
+            name = PROMETHEUS_METRICS[metric][0]
+            samples[metric].append(f"{name}{{{_labels(hub.hub_id, command)}}} {value}")
+        for (metric, command), histogram in sorted(hub.histograms.items()):
+            name = PROMETHEUS_METRICS[metric][0]
+            labels = _labels(hub.hub_id, command)
+            for bound, count in histogram.cumulative():
+                samples[metric].append(
+                    f"{name}_bucket{{{_labels(hub.hub_id, command, le=bound)}}} {count}"
+                )
+            samples[metric].append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            samples[metric].append(f"{name}_count{{{labels}}} {histogram.count}")
+    lines = []
+    for metric, (name, metric_type, description) in PROMETHEUS_METRICS.items():
+        if samples[metric]:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples[metric])
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,113 @@
+"""Registry of the Elro Connects connectors registered in the cloud."""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Mapping
+
+from elro.api import K1
+from elro.auth import ElroConnectsConnector, ElroConnectsSession
+
+CONNECTOR_CACHE_TTL = 300
+# Connector attributes that require the hub to be reconfigured
+CONNECTOR_CHANGE_KEYS = ("ip", "ctrl_key", "online")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ConnectorDiff:
+    """Connectors added, removed and changed by a refresh, by devTid."""
+
+    added: dict[str, ElroConnectsConnector] = field(default_factory=dict)
+    removed: dict[str, ElroConnectsConnector] = field(default_factory=dict)
+    changed: dict[str, ElroConnectsConnector] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        """Return True if any connector was added, removed or changed."""
+        return bool(self.added or self.removed or self.changed)
+
+
+class ConnectorRegistry:
+    """Cache of the connectors of a cloud session.
+
+    The connector list is fetched at most once per ttl seconds, a refresh
+    reports the connectors that were added, removed or changed.
+    """
+
+    def __init__(
+        self, session: ElroConnectsSession, ttl: float = CONNECTOR_CACHE_TTL
+    ) -> None:
+        """Initialize the registry."""
+        self._session = session
+        self._ttl = ttl
+        self._connectors: dict[str, ElroConnectsConnector] = {}
+        self._expires: float = 0.0
+
+    @property
+    def connectors(self) -> dict[str, ElroConnectsConnector]:
+        """Return the cached connectors by devTid."""
+        return self._connectors
+
+    @property
+    def expired(self) -> bool:
+        """Return True if the connector list should be fetched again."""
+        return time.monotonic() >= self._expires
+
+    def get(self, dev_id: str) -> ElroConnectsConnector | None:
+        """Return a cached connector."""
+        return self._connectors.get(dev_id)
+
+    def invalidate(self) -> None:
+        """Fetch the connector list on the next refresh."""
+        self._expires = 0.0
+
+    def update(self, connectors: Iterable[ElroConnectsConnector]) -> ConnectorDiff:
+        """Replace the cached connectors and return the differences."""
+        diff = ConnectorDiff()
+        current = {connector["dev_id"]: connector for connector in connectors}
+        for dev_id, connector in current.items():
+            if (cached := self._connectors.get(dev_id)) is None:
+                diff.added[dev_id] = connector
+            elif any(
+                cached.get(key) != connector.get(key) for key in CONNECTOR_CHANGE_KEYS
+            ):
+                diff.changed[dev_id] = connector
+        for dev_id, connector in self._connectors.items():
+            if dev_id not in current:
+                diff.removed[dev_id] = connector
+        self._connectors = current
+        self._expires = time.monotonic() + self._ttl
+        return diff
+
+    async def async_refresh(self, force: bool = False) -> ConnectorDiff:
+        """Fetch the connectors if the cache expired and return the differences."""
+        if not force and not self.expired:
+            return ConnectorDiff()
+        diff = self.update(await self._session.async_get_connectors())
+        if diff:
+            _LOGGER.debug(
+                "Connectors added: %s, removed: %s, changed: %s",
+                list(diff.added),
+                list(diff.removed),
+                list(diff.changed),
+            )
+        return diff
+
+    async def async_configure_hubs(
+        self, hubs: Mapping[str, K1], force: bool = False
+    ) -> list[str]:
+        """Refresh and reconfigure the hubs of added or changed connectors.
+
+        Returns the devTids of the hubs that were reconfigured.
+        """
+        diff = await self.async_refresh(force)
+        configured = []
+        for dev_id, connector in {**diff.added, **diff.changed}.items():
+            if (hub := hubs.get(dev_id)) is None or not connector["ip"]:
+                continue
+            await hub.async_configure(connector["ip"], api_key=connector["ctrl_key"])
+            configured.append(dev_id)
+        return configured
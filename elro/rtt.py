@@ -0,0 +1,53 @@
+"""Round trip time estimation for the Elro Connects K1 hub."""
+
+from __future__ import annotations
+
+INITIAL_TIME_OUT = 3.0
+MIN_TIME_OUT = 1.0
+MAX_BACKOFF_FACTOR = 8
+
+# Gains and variance factor of RFC 6298
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+
+
+class RttEstimator:
+    """Smoothed round trip time and variance, driving an adaptive time out.
+
+    The time out is backed off after a time out, until a new sample arrives.
+    """
+
+    def __init__(
+        self, initial: float = INITIAL_TIME_OUT, minimum: float = MIN_TIME_OUT
+    ) -> None:
+        """Initialize the estimator."""
+        self._initial = initial
+        self._minimum = minimum
+        self._backoff = 1
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.samples = 0
+
+    def add_sample(self, rtt: float) -> None:
+        """Add a measured round trip time."""
+        if self.srtt is None or self.rttvar is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+        self.samples += 1
+        self._backoff = 1
+
+    def backoff(self) -> None:
+        """Double the time out after a time out."""
+        self._backoff = min(self._backoff * 2, MAX_BACKOFF_FACTOR)
+
+    def timeout(self, maximum: float) -> float:
+        """Return the time out, limited to maximum."""
+        if self.srtt is None or self.rttvar is None:
+            value = self._initial
+        else:
+            value = max(self.srtt + K * self.rttvar, self._minimum)
+        return min(value * self._backoff, maximum)
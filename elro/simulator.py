@@ -0,0 +1,335 @@
+"""Simulated Elro Connects K1 hub for load and latency tests on localhost."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from elro.command import (
+    ACK_APP,
+    CMD_CONNECT,
+    NAME_SYNC_FINISHED,
+    SCENE_SYNC_FINISHED,
+    STATUS_SYNC_FINISHED,
+    Command,
+)
+from elro.frame import ACK_FRAME
+from elro.utils import crc16_hex, decode_device_name, encode_device_name
+
+DEFAULT_CTRL_KEY = "deadbeef012345678deadbeef0123456"
+DEFAULT_BIND_KEY = "0000beef012345678deadbeef0123456"
+DEFAULT_DEVICE_TYPE = "0013"
+DEFAULT_DEVICE_STATUS = "0364AAFF"
+# Status frames end with a record for this device id
+STATUS_SYNC_DEVICE_ID = 65535
+STATE_FIRE_ALARM = "19"
+STATE_NORMAL = "AA"
+# The hub numbers its frames with its own counter, like the captured frames
+HUB_MSG_ID_START = 3640
+# Hex length of an encoded device name without the CRC
+NAME_HEX_LENGTH = 32
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulatedDevice:
+    """A device connected to the simulated hub."""
+
+    device_id: int
+    device_type: str = DEFAULT_DEVICE_TYPE
+    device_status: str = DEFAULT_DEVICE_STATUS
+    name: str = ""
+
+
+class K1Simulator(asyncio.DatagramProtocol):
+    """K1 hub answering the handshake and the commands over real UDP.
+
+    Every datagram is delayed by latency plus a random jitter, dropped with
+    probability loss and delayed past the next datagram with probability
+    reorder. With ack_pacing the frames of a reply are sent one at a time,
+    after the previous frame was acknowledged, like the hub does.
+
+    Frames carry the msgId counter of the hub, with echo_msg_id the replies
+    echo the msgId of the command instead.
+    """
+
+    def __init__(
+        self,
+        k1_id: str,
+        devices: int | Iterable[SimulatedDevice] = 10,
+        ctrl_key: str = DEFAULT_CTRL_KEY,
+        bind_key: str = DEFAULT_BIND_KEY,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        reorder: float = 0.0,
+        frame_interval: float = 0.0,
+        ack_pacing: bool = False,
+        echo_msg_id: bool = False,
+        alarm_interval: float | None = None,
+        scenes: int = 0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the simulator."""
+        if isinstance(devices, int):
+            devices = map(SimulatedDevice, range(1, devices + 1))
+        self.k1_id = k1_id
+        self.ctrl_key = ctrl_key
+        self.bind_key = bind_key
+        self.devices = {device.device_id: device for device in devices}
+        self.scenes = scenes
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.reorder = reorder
+        self.frame_interval = frame_interval
+        self.ack_pacing = ack_pacing
+        self.echo_msg_id = echo_msg_id
+        self.alarm_interval = alarm_interval
+        self.peers: set[tuple[str, int]] = set()
+        self.statistics = {"received": 0, "sent": 0, "dropped": 0, "alarms": 0}
+        self.transport: asyncio.DatagramTransport | None = None
+        self._random = random.Random(seed)
+        self._msg_id = HUB_MSG_ID_START
+        self._queues: dict[tuple[str, int], deque[bytes]] = {}
+        self._alarm_task: asyncio.Task | None = None
+
+    async def async_start(
+        self, host: str = "127.0.0.1", port: int = 0
+    ) -> tuple[str, int]:
+        """Listen for the K1 and return the address of the hub."""
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        if self.alarm_interval:
+            self._alarm_task = loop.create_task(self._async_push_alarms())
+        return self.address
+
+    def close(self) -> None:
+        """Stop the hub."""
+        if self._alarm_task:
+            self._alarm_task.cancel()
+            self._alarm_task = None
+        if self.transport:
+            self.transport.close()
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """Return the address the hub listens on."""
+        return self.transport.get_extra_info("sockname")[:2]
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        """Store the transport."""
+        self.transport = transport
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Forget the transport."""
+        self.transport = None
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Answer a handshake, an acknowledgement or a command."""
+        self.statistics["received"] += 1
+        if self._random.random() < self.loss:
+            self.statistics["dropped"] += 1
+            return
+        if data.startswith(CMD_CONNECT.encode()):
+            if data[len(CMD_CONNECT) :].decode("utf-8", "replace") in ("", self.k1_id):
+                self.peers.add(addr)
+                self._send(
+                    f"NAME:{self.k1_id}\nBIND:{self.bind_key}\n"
+                    f"KEY:{self.ctrl_key}\n".encode(),
+                    addr,
+                )
+            return
+        if data == ACK_APP.encode():
+            if (queue := self._queues.get(addr)) and self.ack_pacing:
+                self._send(queue.popleft(), addr, self.frame_interval)
+            return
+        try:
+            command = json.loads(data)
+            params = command["params"]
+            command_data = params["data"]
+            msg_id = command["msgId"]
+            cmd_id = Command(command_data["cmdId"])
+        except (ValueError, KeyError, TypeError):
+            _LOGGER.debug("Ignoring invalid command %s", data)
+            return
+        if (params.get("devTid"), params.get("ctrlKey")) != (self.k1_id, self.ctrl_key):
+            return
+        self._send(ACK_FRAME, addr)
+        try:
+            answer = self._answer(cmd_id, command_data)
+        except (ValueError, TypeError):
+            _LOGGER.debug("Ignoring invalid command data %s", command_data)
+            return
+        self._reply(
+            addr,
+            [
+                self._frame(data, msg_id if self.echo_msg_id else None)
+                for data in answer
+            ],
+        )
+
+    def _answer(
+        self, cmd_id: Command, command_data: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        """Return the data of the reply frames of a command."""
+        if cmd_id == Command.GET_DEVICE_NAME:
+            return [
+                {
+                    "cmdId": Command.DEVICE_NAME_REPLY.value,
+                    "answer_content": f"{device.device_id:04x}"
+                    + encode_device_name(device.name or f"Device {device.device_id}")[
+                        :NAME_HEX_LENGTH
+                    ],
+                }
+                for device in self.devices.values()
+            ] + [
+                {
+                    "cmdId": Command.DEVICE_NAME_REPLY.value,
+                    "answer_content": NAME_SYNC_FINISHED,
+                }
+            ]
+        if cmd_id in (Command.GET_ALL_EQUIPMENT_STATUS, Command.SYN_DEVICE_STATUS):
+            devices = self.devices.values()
+            if cmd_id == Command.SYN_DEVICE_STATUS:
+                # Only the devices that do not match the CRC vector
+                vector = command_data.get("device_status", "")[4:]
+                devices = [
+                    device
+                    for device in devices
+                    if vector[(device.device_id - 1) * 4 : device.device_id * 4]
+                    != crc16_hex(device.device_status)
+                ]
+            return [self._status(device) for device in devices] + [
+                {
+                    "cmdId": Command.DEVICE_STATUS_UPDATE.value,
+                    "device_ID": STATUS_SYNC_DEVICE_ID,
+                    "device_name": "STATUES",
+                    "device_status": STATUS_SYNC_FINISHED,
+                }
+            ]
+        if cmd_id == Command.SYN_SCENE:
+            return [
+                {
+                    "cmdId": Command.SCENE_STATUS_UPDATE.value,
+                    "sence_group": scene,
+                    "answer_content": f"{scene:06d}",
+                }
+                for scene in range(self.scenes)
+            ] + [
+                {
+                    "cmdId": Command.SCENE_TYPE.value,
+                    "scene_type": 256,
+                    "scene_content": SCENE_SYNC_FINISHED,
+                }
+            ]
+        if cmd_id in (Command.EQUIPMENT_CONTROL, Command.MODIFY_EQUIPMENT_NAME):
+            if (device := self.devices.get(command_data.get("device_ID"))) is None:
+                return []
+            if cmd_id == Command.MODIFY_EQUIPMENT_NAME:
+                device.name = decode_device_name(
+                    command_data.get("device_name", "")[:NAME_HEX_LENGTH]
+                )
+            else:
+                self._control(device, command_data.get("device_status", ""))
+            return [{"cmdId": Command.ANSWER_YES_OR_NO.value, "answer_yes_or_no": 2}]
+        return []
+
+    def _control(self, device: SimulatedDevice, status: str) -> None:
+        """Switch a device or test and silence an alarm."""
+        status = status.upper()
+        if status[:2] == "01":
+            device.device_status = device.device_status[:6] + status[2:4]
+        elif status[:2] in ("17", "BB"):
+            self.push_alarm(device.device_id, status[:2])
+        elif status[:2] == "00":
+            device.device_status = (
+                device.device_status[:4] + STATE_NORMAL + device.device_status[6:]
+            )
+
+    @staticmethod
+    def _status(device: SimulatedDevice) -> dict[str, Any]:
+        """Return the status data of a device."""
+        return {
+            "cmdId": Command.DEVICE_STATUS_UPDATE.value,
+            "device_ID": device.device_id,
+            "device_name": device.device_type,
+            "device_status": device.device_status,
+        }
+
+    def _frame(self, data: dict[str, Any], msg_id: int | None = None) -> bytes:
+        """Return a frame in the format of the hub, numbered by the hub counter."""
+        if msg_id is None:
+            self._msg_id += 1
+            msg_id = self._msg_id
+        return (
+            f'{{"msgId" : {msg_id},"action" : "devSend","params" : '
+            f'{{"devTid" : "{self.k1_id}","appTid" :  [],'
+            f'"data" : {json.dumps(data)}}}}}\n'
+        ).encode()
+
+    def _reply(self, addr: tuple[str, int], frames: list[bytes]) -> None:
+        """Send the frames of a reply, one by one if acknowledgements pace them."""
+        if not frames:
+            return
+        if self.ack_pacing:
+            # The first frame is sent right away, the rest of the reply waits
+            # for acknowledgements behind the frames of earlier replies
+            self._queues.setdefault(addr, deque()).extend(frames[1:])
+            self._send(frames[0], addr)
+            return
+        for index, frame in enumerate(frames):
+            self._send(frame, addr, index * self.frame_interval)
+
+    def _send(self, data: bytes, addr: tuple[str, int], delay: float = 0.0) -> None:
+        """Send a datagram after the simulated latency, jitter, loss and reordering."""
+        if self.transport is None:
+            return
+        if self._random.random() < self.loss:
+            self.statistics["dropped"] += 1
+            return
+        delay += self.latency + self._random.uniform(0, self.jitter)
+        if self._random.random() < self.reorder:
+            delay += 2 * self.frame_interval + self.jitter + 0.001
+        self.statistics["sent"] += 1
+        if delay <= 0:
+            self.transport.sendto(data, addr)
+            return
+        asyncio.get_running_loop().call_later(delay, self._sendto, data, addr)
+
+    def _sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Send a datagram if the hub is still running."""
+        if self.transport is not None:
+            self.transport.sendto(data, addr)
+
+    def push_alarm(self, device_id: int, state: str = STATE_FIRE_ALARM) -> None:
+        """Push an alarm of a device to the connected peers."""
+        device = self.devices[device_id]
+        status = device.device_status
+        device.device_status = status[:4] + state + status[6:]
+        content = f"000BAD{device_id:04X}{device.device_type}{device.device_status}"
+        frame = self._frame(
+            {
+                "cmdId": Command.DEVICE_ALARM_TRIGGER.value,
+                "answer_content": content + crc16_hex(content),
+            }
+        )
+        self.statistics["alarms"] += 1
+        for addr in self.peers:
+            if self.ack_pacing and self._queues.get(addr):
+                self._queues[addr].append(frame)
+            else:
+                self._send(frame, addr)
+
+    async def _async_push_alarms(self) -> None:
+        """Push an alarm of a random device every alarm interval."""
+        while True:
+            await asyncio.sleep(self.alarm_interval)
+            if self.devices and self.peers:
+                self.push_alarm(self._random.choice(list(self.devices)))
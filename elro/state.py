@@ -0,0 +1,150 @@
+"""Device state store for the Elro Connects K1 hub."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Mapping
+
+from elro.device import DeviceState
+
+
+def merge_device_state(
+    state: Mapping[str, Any] | None, update: Mapping[str, Any]
+) -> Mapping[str, Any] | None:
+    """Return the merged state, or state itself if the update changes nothing.
+
+    Parsed states are kept as shared DeviceState records, other updates,
+    like a name of a device without a known state, are merged into a dict.
+    """
+    if isinstance(update, DeviceState):
+        name = update.name
+        if name is None and state is not None:
+            name = state.get("name")
+        if isinstance(state, DeviceState) and state.same_status(update):
+            return state.with_name(name) if name != state.name else state
+        return update.with_name(name)
+    if state is not None and all(
+        key in state and state[key] == value for key, value in update.items()
+    ):
+        return state
+    if isinstance(state, DeviceState) and update.keys() <= {"name"}:
+        return state.with_name(update["name"])
+    return {**(state or {}), **update}
+
+
+class DeviceStateStore:
+    """Device states of a hub, merged incrementally as updates arrive.
+
+    A name of a device without a state is kept aside and merged once the
+    state of the device arrives, so the store only holds device states.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        self._states: dict[int, Mapping[str, Any]] = {}
+        self._names: dict[int, str] = {}
+        self._versions: dict[int, int] = {}
+        self._updated: dict[int, float] = {}
+        self.version = 0
+
+    def update(self, data_update: Mapping[int, Mapping[str, Any]]) -> list[int]:
+        """Merge device state updates, return the ids of the changed devices."""
+        changed = []
+        for device_id, update in data_update.items():
+            state = self._states.get(device_id)
+            if state is None and update.keys() <= {"name"}:
+                if "name" in update:
+                    self._names[device_id] = update["name"]
+                continue
+            base = state
+            if state is None and device_id in self._names:
+                base = {"name": self._names.pop(device_id)}
+            if (new_state := merge_device_state(base, update)) is state:
+                continue
+            self._states[device_id] = new_state
+            self.version += 1
+            self._versions[device_id] = self.version
+            self._updated[device_id] = time.time()
+            changed.append(device_id)
+        return changed
+
+    def changed_since(self, version: int) -> dict[int, Mapping[str, Any]]:
+        """Return the devices that changed after version."""
+        return {
+            device_id: self._states[device_id]
+            for device_id, device_version in self._versions.items()
+            if device_version > version
+        }
+
+    def device_version(self, device_id: int) -> int | None:
+        """Return the version of the last change of a device."""
+        return self._versions.get(device_id)
+
+    def last_updated(self, device_id: int) -> float | None:
+        """Return the timestamp of the last change of a device."""
+        return self._updated.get(device_id)
+
+    def get(self, device_id: int) -> Mapping[str, Any] | None:
+        """Return the state of a device."""
+        return self._states.get(device_id)
+
+    def clear(self) -> None:
+        """Remove all devices, the version keeps increasing."""
+        self._states.clear()
+        self._names.clear()
+        self._versions.clear()
+        self._updated.clear()
+
+    @property
+    def states(self) -> dict[int, Mapping[str, Any]]:
+        """Return the states of all devices."""
+        return self._states
+
+    def __contains__(self, device_id: object) -> bool:
+        """Return True if the device is known."""
+        return device_id in self._states
+
+    def __len__(self) -> int:
+        """Return the number of known devices."""
+        return len(self._states)
+
+
+class DeviceNameCache:
+    """Device names of a hub, valid until an unknown device shows up."""
+
+    def __init__(self) -> None:
+        """Initialize the cache."""
+        self._names: dict[int, str] | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def valid(self) -> bool:
+        """Return True if the cache holds the names of all devices."""
+        return self._names is not None
+
+    def get(self) -> dict[int, dict[str, Any]] | None:
+        """Return the cached names in the GET_DEVICE_NAMES format, None on a miss."""
+        if self._names is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {device_id: {"name": name} for device_id, name in self._names.items()}
+
+    def update(self, names: dict[int, dict[str, Any]]) -> None:
+        """Replace the cached names with a GET_DEVICE_NAMES result."""
+        self._names = {device_id: data["name"] for device_id, data in names.items()}
+
+    def set_name(self, device_id: int, name: str) -> None:
+        """Update the name of a single device."""
+        if self._names is not None:
+            self._names[device_id] = name
+
+    def check_device(self, device_id: int) -> None:
+        """Invalidate the cache if the device is not known."""
+        if self._names is not None and device_id not in self._names:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """Invalidate the cache, the names need to be fetched again."""
+        self._names = None
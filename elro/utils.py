@@ -2,13 +2,23 @@
 
 from __future__ import annotations
 
-import json
+import functools
 import logging
-import collections
-from typing import Any
-
-from elro.device import DEVICE_VALUE, STATE_NORMAL, DeviceType, DEVICE_STATE
+from typing import Any, Mapping
+
+from elro.device import (
+    DEVICE_VALUE,
+    STATE_NORMAL,
+    DeviceState,
+    DeviceType,
+    DEVICE_STATE,
+)
+from elro.frame import parse_frame
+from elro.state import merge_device_state
 
+EQ_CRC_CACHE_SIZE = 1024
+DEVICE_STATE_CACHE_SIZE = 8192
+NAME_CODEC_CACHE_SIZE = 1024
 
 # From the ByteUtil class, needed by CRC_maker
 AUCHCRCHI = (
@@ -48,17 +58,11 @@ def get_string_from_ascii(input_string):
     :param input: A hex string
     :return: A string
     """
-    try:
-        if len(input_string) != 32:
-            raise ValueError("input {} has not the required length of 32.")
+    if len(input_string) != 32:
+        raise ValueError(f"input {input_string} has not the required length of 32.")
 
-        byt = bytearray.fromhex(input_string)
-        name = "".join(map(chr, byt))
-        name = name.replace("@", "").replace("$", "")
-    except ValueError as error:
-        raise error
-
-    return name
+    # Every byte is a character, the padding "@" and terminator "$" are removed
+    return bytes.fromhex(input_string).translate(None, b"@$").decode("latin-1")
 
 
 def get_ascii(input_string: str) -> str | None:
@@ -72,20 +76,13 @@ def get_ascii(input_string: str) -> str | None:
 
     # Pattern("^[_\-a-zA-Z0-9 ]*$"
 
-    countf = 0
-
-    countf = 15 - len(input_string.encode("GBK"))
+    name = input_string.encode("GBK")
+    countf = 15 - len(name)
 
     if countf < 0:
         logging.error("Input is to long '%s'", input_string)
         return None
 
-    str_whitespace = ""
-    for _ in range(countf):
-        str_whitespace += "@"
-
-    new_name = str_whitespace + input_string + "$"
-
     # This is the original code and thus where the python code differs.
     # Because this is not used, GBK encoding is probably not fully supported
 
@@ -118,50 +115,45 @@ def get_ascii(input_string: str) -> str | None:
     #    return (char) (highU8 << 8 | lowU8);
     # }
 
-    return new_name.encode("GBK").hex()
+    return (b"@" * countf + name + b"$").hex()
 
 
-def crc_maker(msg):
-    """
-    This function is reversed engineered and translated to python
-    based on the ByteUtil class in the ELRO Android app
+@functools.lru_cache(maxsize=NAME_CODEC_CACHE_SIZE)
+def encode_device_name(device_name: str) -> str:
+    """Return the hex representation of a device name including the crc."""
+    if (device_name_hex := get_ascii(device_name)) is None:
+        raise ValueError(f"Device name '{device_name}' is too long")
+    return f"{device_name_hex}{crc_maker(device_name)}"
 
-    :param input: The string to create a CRC for
-    :return: A CRC string
-    """
-    crc_hi_1 = 0
-    crc_lo_1 = 0
-    msg_length = len(msg)
-    index = 0
-    crc_index = 0
-    uch_crc_hi = 0xFF
-    uch_crc_lo = 0xFF
 
-    while index < msg_length:
-        char_code = ord(msg[index])
+@functools.lru_cache(maxsize=NAME_CODEC_CACHE_SIZE)
+def decode_device_name(device_name_hex: str) -> str:
+    """Return the device name of a hex representation without crc."""
+    return get_string_from_ascii(device_name_hex)
 
-        crc_index = uch_crc_hi ^ char_code
-        uch_crc_hi = uch_crc_lo ^ AUCHCRCHI[crc_index]
-        uch_crc_lo = AUCHCRCLO[crc_index]
 
-        index = index + 1
+# Single table CRC16 (Modbus) engine, combined from AUCHCRCHI and AUCHCRCLO
+CRC_TABLE = tuple(AUCHCRCLO[index] << 8 | AUCHCRCHI[index] for index in range(256))
 
-    crc_lo_1 = uch_crc_hi
-    crc_lo_2 = int(crc_lo_1)
-    crc_lo_3 = hex(crc_lo_2)[2:]
-    if len(crc_lo_3) < 2:
-        crc_lo_3 = "0" + crc_lo_3
 
-    crc_hi_1 = uch_crc_lo
-    crc_hi_2 = int(crc_hi_1)
-    crc_hi_3 = hex(crc_hi_2)[2:]
-    if len(crc_hi_3) < 2:
-        crc_hi_3 = "0" + crc_hi_3
+def crc16(data: bytes | bytearray | memoryview) -> int:
+    """Return the CRC16 of data as used by the K1 hub."""
+    crc = 0xFFFF
+    table = CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
 
-    return f"{crc_hi_3.upper()}{crc_lo_3.upper()}"
 
+def crc16_hex(hex_string: str) -> str:
+    """Return the CRC string of a hex string."""
+    if len(hex_string) & 1:
+        # A trailing nibble is ignored, like the original app does
+        hex_string = hex_string[:-1]
+    return f"{crc16(bytes.fromhex(hex_string)):04X}"
 
-def crc_maker_char(msg):
+
+def crc_maker(msg):
     """
     This function is reversed engineered and translated to python
     based on the ByteUtil class in the ELRO Android app
@@ -169,44 +161,24 @@ def crc_maker_char(msg):
     :param input: The string to create a CRC for
     :return: A CRC string
     """
+    return f"{crc16(msg.encode('latin-1')):04X}"
 
-    crc_hi_1 = 0
-    crc_lo_1 = 0
-    index = 0
-    crc_index = 0
-    uch_crc_hi = 0xFF
-    uch_crc_lo = 0xFF
-
-    msg_length = int(len(msg) / 2)
-    content = []
-
-    for _ in range(msg_length):
-        val = chr(int((msg[0:2]), 16))
-        content.append(val)
-        msg = msg[2:]
 
-    while index < msg_length:
-        char_code = ord(content[index])
-
-        crc_index = uch_crc_hi ^ char_code
-        uch_crc_hi = uch_crc_lo ^ AUCHCRCHI[crc_index]
-        uch_crc_lo = AUCHCRCLO[crc_index]
-
-        index = index + 1
+def crc_maker_char(msg):
+    """
+    This function is reversed engineered and translated to python
+    based on the ByteUtil class in the ELRO Android app
 
-    crc_lo_1 = uch_crc_hi
-    crc_lo_2 = int(crc_lo_1)
-    crc_lo_3 = hex(crc_lo_2)[2:]
-    if len(crc_lo_3) < 2:
-        crc_lo_3 = "0" + crc_lo_3
+    :param input: The hex string to create a CRC for
+    :return: A CRC string
+    """
+    return crc16_hex(msg)
 
-    crc_hi_1 = uch_crc_lo
-    crc_hi_2 = int(crc_hi_1)
-    crc_hi_3 = hex(crc_hi_2)[2:]
-    if len(crc_hi_3) < 2:
-        crc_hi_3 = "0" + crc_hi_3
 
-    return f"{crc_hi_3.upper()}{crc_lo_3.upper()}"
+@functools.lru_cache(maxsize=EQ_CRC_CACHE_SIZE)
+def _status_crc(device_status: str) -> str:
+    """Return the CRC of a device status, device states rarely change."""
+    return crc16_hex(device_status)
 
 
 def get_eq_crc(devices):
@@ -215,30 +187,19 @@ def get_eq_crc(devices):
     and translated to python. It is based on the CoderUtils class in the elro app :param devices:.
     A dictionary of devices statuses, where the id of the device is the index of the dict
     """
-    sorted_devices = collections.OrderedDict(sorted(devices.items()))
-    list_length = int(list(sorted_devices.keys())[-1])
-
-    status_crc = ""
-    for i in range(list_length + 1):
-        if i + 1 in sorted_devices:
-            status_crc += crc_maker_char(sorted_devices[i + 1])
-        elif i < (list_length):
-            status_crc += "0000"
-
-    num = ""
-    list_length_for_hex = hex((list_length * 2 + 2))[2:]
-    if len(list_length_for_hex) < 4:
-        i = 4 - len(list_length_for_hex)
-        num = list_length_for_hex.rjust(i + len(list_length_for_hex), "0")
-    else:
-        num = list_length_for_hex
+    list_length = int(max(devices))
+    # One slot per device id from 1 up to the highest id, "0000" for unused ids
+    status_crc = ["0000"] * list_length
+    for device_id, device_status in devices.items():
+        if 0 < device_id <= list_length:
+            status_crc[device_id - 1] = _status_crc(device_status)
 
-    return num + status_crc
+    return f"{list_length * 2 + 2:04x}" + "".join(status_crc)
 
 
 def update_state_data(
-    data: dict[int, dict[str, Any]] | None,
-    data_update: dict[int, dict[str, Any]] | None,
+    data: dict[int, Mapping[str, Any]] | None,
+    data_update: dict[int, Mapping[str, Any]] | None,
 ) -> None:
     "Update the state."
     if data_update is None or data is None:
@@ -246,8 +207,11 @@ def update_state_data(
     for key in data_update.keys():
         if not key in data:
             data[key] = data_update[key]
-        else:
+        elif isinstance(data[key], dict):
             data[key].update(data_update[key])
+        else:
+            # Parsed states are read only records, replace them with the merge
+            data[key] = merge_device_state(data[key], data_update[key])
 
 
 def get_device_names(content: list) -> dict:
@@ -255,7 +219,7 @@ def get_device_names(content: list) -> dict:
     # answer_content
     return {
         int(data["answer_content"][0:4], 16): {
-            "name": get_string_from_ascii(data["answer_content"][4:])
+            "name": decode_device_name(data["answer_content"][4:])
         }
         for data in content
     }
@@ -264,50 +228,97 @@ def get_device_names(content: list) -> dict:
 def set_device_name(argv: dict) -> None:
     """Convert the device_name attribute to a hex representation including crc."""
     if device_name := argv.get("device_name"):
-        device_name_hex = get_ascii(device_name)
-        crc = crc_maker(device_name)
-        argv["device_name"] = f"{device_name_hex}{crc}"
+        argv["device_name"] = encode_device_name(device_name)
     else:
         raise ValueError("Value for device_name is not set!")
 
 
-def get_device_states(content: list) -> dict[str, Any]:
-    """Return device states."""
+def _device_state(device_state: str, device_type: str) -> str:
+    """Get the correct device state for door contacts"""
+    if device_state=="AA" and device_type != DeviceType.DOOR_WINDOW_SENSOR.name:
+        return STATE_NORMAL
+    return DEVICE_STATE.get(
+        device_state, device_state
+    )
+
+
+# Lookup tables to decode the status data, built once
+DEVICE_TYPE_NAMES: dict[str, str] = {
+    code: device_type.name
+    for code, device_type in DeviceType._value2member_map_.items()  # pylint: disable=no-member
+}
+DEVICE_STATE_NAMES: dict[str, str] = {
+    code: _device_state(code, code)  # return hex device state if it is not known
+    for code in (f"{value:02X}" for value in range(256))
+}
+DEVICE_VALUE_NAMES: tuple[str, ...] = tuple(
+    DEVICE_VALUE.get(value, hex(value))  # return hex device value if it is not known
+    for value in range(256)
+)
 
-    def _device_state(device_state: str, device_type: str) -> str:
-        """Get the correct device state for door contacts"""
-        if device_state=="AA" and device_type != DeviceType.DOOR_WINDOW_SENSOR.name:
-            return STATE_NORMAL
-        return DEVICE_STATE.get(
-            device_state, device_state
-        )
 
+@functools.lru_cache(maxsize=DEVICE_STATE_CACHE_SIZE)
+def get_device_state(
+    device_id: int, device_name: str, device_status: str
+) -> DeviceState | None:
+    """Return the device state parsed from the status data, None if unsupported.
 
+    The records are cached, unchanged devices return the same object.
+    """
+    if (device_type := DEVICE_TYPE_NAMES.get(device_name)) is None:
+        # Unsupported record
+        return None
+    try:
+        if len(device_status) != 8:
+            raise ValueError
+        signal, battery, _, device_value_data = bytes.fromhex(device_status)
+    except ValueError:
+        # Decode the fields one by one, raises a ValueError for invalid data
+        signal = int(device_status[0:2], 16)
+        battery = int(device_status[2:4], 16)
+        device_value_data = int(device_status[6:8], 16)
+    device_state = device_status[4:6]
+    return DeviceState(
+        device_id,
+        device_name,
+        device_status,
+        device_type,
+        signal,
+        battery,
+        DEVICE_STATE_NAMES.get(device_state, device_state),
+        DEVICE_VALUE_NAMES[device_value_data],
+        device_value_data,
+    )
+
+
+def get_device_states(content: list) -> dict[int, DeviceState]:
+    """Return device states."""
     return_dict = {}
     for hexdata in content:
-        try:
-            device_type = DeviceType(hexdata["device_name"]).name
-        except ValueError:
-            # Unsupported record, skip and continue silently
-            continue
-        device_state = hexdata["device_status"][4:6]
-        device_value_data = int(hexdata["device_status"][6:8], 16)
-        return_dict[hexdata["device_ID"]] = {
-            "device_type": device_type,
-            "signal": int(hexdata["device_status"][0:2], 16),
-            "battery": int(hexdata["device_status"][2:4], 16),
-            "device_state": _device_state(
-                device_state, device_state
-            ),  # return hex device state if it is not known
-            "device_value": DEVICE_VALUE.get(
-                device_value_data, hex(device_value_data)
-            ),  # return hex device value if it is not known
-            "device_status_data": hexdata,
-            "device_value_data": device_value_data,
-        }
+        device_state = get_device_state(
+            hexdata["device_ID"], hexdata["device_name"], hexdata["device_status"]
+        )
+        # Unsupported records are skipped silently
+        if device_state is not None:
+            return_dict[hexdata["device_ID"]] = device_state
     return return_dict
 
 
+def get_alarm_trigger_data(answer_content: str) -> dict[str, Any]:
+    """Return the device status data from a DEVICE_ALARM_TRIGGER answer_content."""
+    # 000B AD 0003 0013 046419A5 51EA: unknown, type, device id, type, status, crc
+    return {
+        "device_ID": int(answer_content[6:10], 16),
+        "device_name": answer_content[10:14],
+        "device_status": answer_content[14:22],
+    }
+
+
+def check_alarm_trigger_crc(answer_content: str) -> bool:
+    """Return True if the CRC of a DEVICE_ALARM_TRIGGER answer_content is valid."""
+    return crc16_hex(answer_content[:-4]) == answer_content[-4:].upper()
+
+
 def get_default(content: list) -> dict:
     """Return content from ascii."""
     index = 0
@@ -321,10 +332,7 @@ def get_default(content: list) -> dict:
 
 def validate_json(raw_data: bytes) -> dict:
     """Process the JSON basis response, work-a-round synatx errors."""
-    json_string = raw_data.decode("utf-8")
-    try:
-        data = json.loads(json_string)
-    except json.decoder.JSONDecodeError:
-        # Try correct the malformed JSON status string missing to closing brackets
-        data = json.loads(json_string + "}}")
+    _, data = parse_frame(raw_data)
+    if data is None:
+        raise ValueError("Acknowledgement frame has no JSON data")
     return data
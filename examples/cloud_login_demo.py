@@ -26,6 +26,7 @@ class CloudDemo(ElroConnectsSession):
             print(connector["dev_id"])
             print(connector["sw_version"])
             print(connector["online"])
+        await self.async_close()
 
 
 if __name__ == "__main__":
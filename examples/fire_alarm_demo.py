@@ -28,13 +28,18 @@ class AlarmDemo(K1):
         # You can call await self.async_connect() but if there is no actice session
         # await self.async_connect() will be called for you
 
+        version = 0
         while True:
             try:
-                data = await self.async_process_command(GET_ALL_EQUIPMENT_STATUS)
-                names = await self.async_process_command(GET_DEVICE_NAMES)
-                update_state_data(data, names)
+                # The replies are merged in self.device_states, the hub only
+                # sends the devices that changed since the last poll
+                await self.async_sync_device_status()
+                # Names are only fetched again when a new device shows up
+                await self.async_get_device_names()
                 print(f"=={datetime.now()}")
-                for key, item in data.items():
+                changed = self.device_states.changed_since(version)
+                version = self.device_states.version
+                for key, item in changed.items():
                     print(
                         f"{key} ({item.get('name')}): status={item['device_state']} data={item['device_status_data']}"
                     )
@@ -43,6 +48,19 @@ class AlarmDemo(K1):
             finally:
                 await asyncio.sleep(INTERVAL)
 
+    async def async_demo3(self) -> None:
+        """Demonstrate reacting to pushed alarms without polling."""
+        # The frames pushed by the hub are acknowledged for you,
+        # the keepalive restores the session if the hub was unreachable
+        await self.async_start_keepalive()
+        async for event in self.async_events():
+            print(f"=={datetime.now()}")
+            print(
+                f"{event.command.name} {event.device_id}: "
+                f"status={event.state['device_state'] if event.state else None} "
+                f"data={event.data}"
+            )
+
     async def async_demo2(self) -> None:
         """Main routine to demonstrate the API code."""
         logging.basicConfig(level=logging.DEBUG)
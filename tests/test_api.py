@@ -3,20 +3,28 @@
 # pylint: disable=line-too-long,redefined-outer-name,protected-access
 
 import asyncio
+import contextlib
 import json
 from threading import local
 
 from unittest.mock import MagicMock, patch
 import pytest
+import pytest_asyncio
 
-from elro.api import K1
+from elro.api import K1, INBOUND_QUEUE_SIZE, MSG_ID_ECHO_CHECKS
+from elro.rtt import RttEstimator
+from elro.simulator import K1Simulator, SimulatedDevice
+from elro.utils import get_eq_crc
 from elro.command import (
+    Command,
     GET_SCENES,
     SET_DEVICE_NAME,
     SYN_DEVICE_STATUS,
     GET_DEVICE_NAMES,
     GET_ALL_EQUIPMENT_STATUS,
     TEST_ALARM,
+    SOCKET_ON,
+    SOCKET_OFF,
     SILENCE_ALARM,
 )
 
@@ -53,6 +61,8 @@ MOCK_SOCKET_STATUS_OFF_RESPONSE = [
     b'{"msgId" : 3655,"action" : "devSend","params" : {"devTid" : "ST_1234567890ab","appTid" :  [],"data" : {"cmdId" : 19,"device_ID" : 65535,"device_name" : "STATUES","device_status" : "OVER" }}}\n',
 ]
 
+MOCK_ALARM_TRIGGER_PUSH = b'{"msgId" : 3656,"action" : "devSend","params" : {"devTid" : "ST_1234567890ab","appTid" :  [],"data" : {"cmdId" : 25,"answer_content" : "000BAD00030013046419A551EA" }}}\n'
+
 MOCK_SET_EQUIPMENT_RESPONSE = [
     b'{"msgId" : 8,"action" : "devSend","params" : {"devTid" : "ST_1234567890ab","appTid" :  [],"data" : {"cmdId" : 11,"answer_yes_or_no" : 2 }}}\n'
 ]
@@ -62,8 +72,8 @@ class K1Mock(K1):
     """Mock class."""
 
 
-@pytest.fixture
-def mock_k1_connector():
+@pytest_asyncio.fixture
+async def mock_k1_connector():
     """Mock a K1 connector."""
 
     async def _async_create_datagram_endpoint(protocol_factory, remote_addr):
@@ -81,11 +91,13 @@ def mock_k1_connector():
     loop.create_datagram_endpoint = MagicMock()
     loop.create_datagram_endpoint.side_effect = _async_create_datagram_endpoint
 
-    return K1Mock("127.0.0.1", "ST_1234567890ab")
+    connector = K1Mock("127.0.0.1", "ST_1234567890ab")
+    yield connector
+    await connector.async_disconnect()
 
 
-@pytest.fixture
-def mock_k1_connector_no_key():
+@pytest_asyncio.fixture
+async def mock_k1_connector_no_key():
     """Mock a K1 connector without api key exposure."""
 
     async def _async_create_datagram_endpoint(protocol_factory, remote_addr):
@@ -103,7 +115,9 @@ def mock_k1_connector_no_key():
     loop.create_datagram_endpoint = MagicMock()
     loop.create_datagram_endpoint.side_effect = _async_create_datagram_endpoint
 
-    return K1Mock("127.0.0.1", "ST_1234567890ab")
+    connector = K1Mock("127.0.0.1", "ST_1234567890ab")
+    yield connector
+    await connector.async_disconnect()
 
 
 def help_mock_command_reply(mock_k1_connector, response):
@@ -392,6 +406,7 @@ async def test_key_override():
     assert mock_k1_connector.connector_id == "ST_1234567890ab"
     assert mock_k1_connector.bind_key == "0000beef012345678deadbeef0123456"
     assert mock_k1_connector.api_key == "override_key"
+    await mock_k1_connector.async_disconnect()
 
     # test add missing key with auth response WITHOUT key
     auth_response = MOCK_AUTH_RESPONSE_LIMITED
@@ -402,3 +417,585 @@ async def test_key_override():
     assert mock_k1_connector.connector_id == "ST_1234567890ab"
     assert mock_k1_connector.bind_key is None
     assert mock_k1_connector.api_key == "override_key"
+    await mock_k1_connector.async_disconnect()
+
+
+@pytest.mark.asyncio
+async def test_hubs_do_not_share_lock(mock_k1_connector):
+    """Test a busy hub does not block other hubs."""
+    other_k1_connector = K1Mock("127.0.0.2", "ST_1234567890ab")
+    assert mock_k1_connector._lock is not other_k1_connector._lock
+
+    await mock_k1_connector._lock.acquire()
+    try:
+        await asyncio.wait_for(other_k1_connector.async_connect(), 1)
+        assert other_k1_connector.connector_id == "ST_1234567890ab"
+    finally:
+        mock_k1_connector._lock.release()
+    await other_k1_connector.async_disconnect()
+
+
+@pytest.mark.asyncio
+async def test_status_burst_is_not_lost(mock_k1_connector):
+    """Test all frames are processed when the hub sends them in one burst."""
+    await mock_k1_connector.async_connect()
+
+    def sendto(data):
+        """Reply with all status frames at once."""
+        if data == b"APP_answer_OK":
+            return
+        for response in MOCK_DEVICE_STATUS_RESPONSE:
+            mock_k1_connector._protocol.datagram_received(
+                response, mock_k1_connector._remoteaddress
+            )
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+
+    result = await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+
+    assert list(result) == [1, 2, 3]
+    assert mock_k1_connector.inbound_statistics == {
+        "received": 5,
+        "dropped": 0,
+        "queued": 0,
+        "high_water": 4,
+        "repaired": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_inbound_queue_overflow(mock_k1_connector):
+    """Test datagrams are counted when the inbound queue overflows."""
+    await mock_k1_connector.async_connect()
+
+    protocol = mock_k1_connector._protocol
+    for _ in range(INBOUND_QUEUE_SIZE + 3):
+        protocol.datagram_received(b"{ST_answer_OK}", mock_k1_connector._remoteaddress)
+
+    assert mock_k1_connector.inbound_statistics["dropped"] == 3
+    assert mock_k1_connector.inbound_statistics["high_water"] == INBOUND_QUEUE_SIZE
+
+
+@pytest.mark.asyncio
+async def test_concurrent_commands_on_paced_hub():
+    """Test a slow query does not block a command with another reply type."""
+    simulator = K1Simulator(
+        "ST_1234567890ab",
+        [SimulatedDevice(1, "1200", "04FF0100")]
+        + [SimulatedDevice(device_id) for device_id in range(2, 21)],
+        ack_pacing=True,
+        frame_interval=0.01,
+    )
+    host, port = await simulator.async_start()
+    hub = K1(host, "ST_1234567890ab", port=port)
+    try:
+        await hub.async_connect()
+        names = asyncio.ensure_future(hub.async_process_command(GET_DEVICE_NAMES))
+        await asyncio.sleep(0.02)
+        await asyncio.wait_for(hub.async_process_command(SOCKET_ON, device_ID=1), 0.1)
+        assert not names.done()
+        assert (await names)[20] == {"name": "Device 20"}
+
+        # Queries waiting for the same reply type are serialized
+        states, _ = await asyncio.gather(
+            hub.async_process_command(GET_ALL_EQUIPMENT_STATUS),
+            hub.async_sync_device_status(),
+        )
+        assert len(states) == 20
+        assert states[1]["device_value"] == "on"
+        assert hub.connection_statistics["retransmits"] == 0
+    finally:
+        await hub.async_disconnect()
+        simulator.close()
+
+
+@pytest.mark.asyncio
+async def test_reply_routed_by_msg_id(mock_k1_connector):
+    """Test a reply echoing the msgId is routed to its command by reply type."""
+    await mock_k1_connector.async_connect()
+
+    def sendto(data):
+        """Reply with the echoed msgId."""
+        if data == b"APP_answer_OK":
+            return
+        msg_id = json.loads(data)["msgId"]
+        mock_k1_connector._protocol.datagram_received(
+            MOCK_SET_EQUIPMENT_RESPONSE[0].replace(
+                b'"msgId" : 8', f'"msgId" : {msg_id}'.encode()
+            ),
+            mock_k1_connector._remoteaddress,
+        )
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+
+    await asyncio.wait_for(
+        mock_k1_connector.async_process_command(TEST_ALARM, device_ID=1), 1
+    )
+    assert not mock_k1_connector._receivers
+
+
+@pytest.mark.asyncio
+async def test_event_stream(mock_k1_connector):
+    """Test pushed frames are acknowledged and yielded as events."""
+    await mock_k1_connector.async_connect()
+
+    events = mock_k1_connector.async_events()
+    next_event = asyncio.ensure_future(events.__anext__())
+    await asyncio.sleep(0)
+
+    mock_k1_connector._protocol.datagram_received(
+        MOCK_ALARM_TRIGGER_PUSH, mock_k1_connector._remoteaddress
+    )
+    event = await asyncio.wait_for(next_event, 1)
+    assert event.command == Command.DEVICE_ALARM_TRIGGER
+    assert event.device_id == 3
+    assert event.state["device_type"] == "FIRE_ALARM"
+    assert event.state["device_state"] == "FIRE ALARM"
+    assert mock_k1_connector._transport.sendto.call_args[0][0] == b"APP_answer_OK"
+
+    # An alarm with an invalid CRC is dropped
+    mock_k1_connector._protocol.datagram_received(
+        MOCK_ALARM_TRIGGER_PUSH.replace(b"51EA", b"51EB"),
+        mock_k1_connector._remoteaddress,
+    )
+    mock_k1_connector._protocol.datagram_received(
+        MOCK_SOCKET_STATUS_ON_RESPONSE[0], mock_k1_connector._remoteaddress
+    )
+    event = await asyncio.wait_for(events.__anext__(), 1)
+    assert event.command == Command.DEVICE_STATUS_UPDATE
+    assert event.device_id == 1
+    assert event.state["device_value"] == "on"
+
+    next_event = asyncio.ensure_future(events.__anext__())
+    await asyncio.sleep(0)
+    await mock_k1_connector.async_disconnect()
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(next_event, 1)
+
+
+@pytest.mark.asyncio
+async def test_alarm_during_status_poll(mock_k1_connector):
+    """Test an alarm pushed in the middle of a status poll is published."""
+    await mock_k1_connector.async_connect()
+    events = mock_k1_connector.async_events()
+    next_event = asyncio.ensure_future(events.__anext__())
+    await asyncio.sleep(0)
+
+    help_mock_command_reply(
+        mock_k1_connector,
+        MOCK_DEVICE_STATUS_RESPONSE[:1]
+        + [MOCK_ALARM_TRIGGER_PUSH]
+        + MOCK_DEVICE_STATUS_RESPONSE[1:],
+    )
+    result = await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+    assert list(result) == [1, 2, 3]
+
+    event = await asyncio.wait_for(next_event, 1)
+    assert event.command == Command.DEVICE_ALARM_TRIGGER
+    assert event.device_id == 3
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_session_refresh_reuses_transport(mock_k1_connector):
+    """Test the transport is reused when only the session is refreshed."""
+    await mock_k1_connector.async_connect()
+
+    with patch("elro.api.TIME_OUT", 0.1), pytest.raises(K1.K1ConnectionError):
+        await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+    assert mock_k1_connector.api_key is None
+
+    def sendto(data):
+        """Answer the handshake and the command."""
+        if data.startswith(b"IOT_KEY?"):
+            response = MOCK_AUTH_RESPONSE
+        elif data.startswith(b"{"):
+            response = MOCK_SET_EQUIPMENT_RESPONSE[0]
+        else:
+            return
+        mock_k1_connector._protocol.datagram_received(
+            response, mock_k1_connector._remoteaddress
+        )
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+    await mock_k1_connector.async_process_command(SOCKET_ON, device_ID=1)
+
+    assert mock_k1_connector.api_key == "deadbeef012345678deadbeef0123456"
+    assert asyncio.get_event_loop().create_datagram_endpoint.call_count == 1
+    assert mock_k1_connector.connection_statistics == {
+        "handshakes": 2,
+        "endpoints": 1,
+        # The lost status query was sent again twice
+        "retransmits": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_keepalive(mock_k1_connector):
+    """Test the hub is probed when the connection is idle."""
+    await mock_k1_connector.async_connect()
+    help_mock_command_reply(mock_k1_connector, MOCK_DEVICE_STATUS_RESPONSE)
+
+    await mock_k1_connector.async_start_keepalive(0.05)
+    await asyncio.sleep(0.2)
+
+    probes = [
+        json.loads(call[0][0])
+        for call in mock_k1_connector._transport.sendto.call_args_list
+        if call[0][0].startswith(b"{")
+    ]
+    assert probes[0]["params"]["data"]["cmdId"] == 29
+    assert mock_k1_connector.connection_statistics["handshakes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_keepalive_survives_unexpected_errors(mock_k1_connector, caplog):
+    """Test the keepalive backs off on any error and disconnect still closes."""
+    await mock_k1_connector.async_connect()
+    transport = mock_k1_connector._transport
+    probes = 0
+
+    async def _async_sync_device_status():
+        """Fail with an unexpected error."""
+        nonlocal probes
+        probes += 1
+        raise KeyError("device_ID")
+
+    with patch.object(
+        mock_k1_connector, "async_sync_device_status", _async_sync_device_status
+    ), patch("elro.api.RECONNECT_BACKOFF_MIN", 0.01):
+        await mock_k1_connector.async_start_keepalive(0)
+        await asyncio.sleep(0.1)
+        assert probes > 1
+        assert not mock_k1_connector._keepalive.done()
+    assert "Unexpected error in keepalive" in caplog.text
+
+    # A keepalive that ended with an error does not stop the disconnect
+    mock_k1_connector._keepalive.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await mock_k1_connector._keepalive
+    mock_k1_connector._keepalive = asyncio.ensure_future(_async_sync_device_status())
+    await asyncio.sleep(0)
+    await mock_k1_connector.async_disconnect()
+    transport.close.assert_called_once()
+    assert mock_k1_connector._transport is None
+
+
+@pytest.mark.asyncio
+async def test_device_state_store(mock_k1_connector):
+    """Test the hub keeps the merged device states."""
+    await mock_k1_connector.async_connect()
+
+    help_mock_command_reply(mock_k1_connector, MOCK_DEVICE_STATUS_RESPONSE)
+    await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+    help_mock_command_reply(mock_k1_connector, MOCK_GET_DEVICE_NAME_RESPONSE)
+    await mock_k1_connector.async_process_command(GET_DEVICE_NAMES)
+
+    store = mock_k1_connector.device_states
+    assert store.get(1)["name"] == "Beganegrond"
+    assert store.get(2)["device_state"] == "ALARM"
+    version = store.version
+
+    # A pushed update only changes device 2
+    mock_k1_connector._protocol.datagram_received(
+        MOCK_DEVICE_STATUS_RESPONSE[1].replace(b"044B55FF", b"044BAAFF"),
+        mock_k1_connector._remoteaddress,
+    )
+    await asyncio.sleep(0)
+    changed = store.changed_since(version)
+    assert list(changed) == [2]
+    assert changed[2]["device_state"] == "NORMAL"
+    assert changed[2]["name"] == "Eerste etage"
+
+
+@pytest.mark.asyncio
+async def test_device_name_cache(mock_k1_connector):
+    """Test device names are only fetched when not cached."""
+    await mock_k1_connector.async_connect()
+
+    help_mock_command_reply(mock_k1_connector, MOCK_GET_DEVICE_NAME_RESPONSE)
+    names = await mock_k1_connector.async_get_device_names()
+    assert names[1]["name"] == "Beganegrond"
+    sent = mock_k1_connector._transport.sendto.call_count
+
+    assert await mock_k1_connector.async_get_device_names() == names
+    assert mock_k1_connector._transport.sendto.call_count == sent
+
+    help_mock_command_reply(mock_k1_connector, MOCK_SET_EQUIPMENT_RESPONSE)
+    await mock_k1_connector.async_process_command(
+        SET_DEVICE_NAME, device_ID=1, device_name="Barn"
+    )
+    names = await mock_k1_connector.async_get_device_names()
+    assert names[1]["name"] == "Barn"
+    # The name of a device without a state is not a state
+    assert 1 not in mock_k1_connector.device_states
+    assert mock_k1_connector.name_cache_statistics == {"hits": 2, "misses": 1}
+
+    # An unknown device invalidates the cache
+    mock_k1_connector._protocol.datagram_received(
+        MOCK_DEVICE_STATUS_RESPONSE[0].replace(b'"device_ID" : 1', b'"device_ID" : 4'),
+        mock_k1_connector._remoteaddress,
+    )
+    await asyncio.sleep(0)
+    help_mock_command_reply(mock_k1_connector, MOCK_GET_DEVICE_NAME_RESPONSE)
+    await mock_k1_connector.async_get_device_names()
+    assert mock_k1_connector.name_cache_statistics == {"hits": 2, "misses": 2}
+
+
+@pytest.mark.asyncio
+async def test_sync_device_status_delta(mock_k1_connector):
+    """Test the CRC vector of the cached states is sent with SYN_DEVICE_STATUS."""
+    await mock_k1_connector.async_connect()
+
+    help_mock_command_reply(mock_k1_connector, MOCK_DEVICE_STATUS_RESPONSE)
+    changed = await mock_k1_connector.async_sync_device_status()
+    assert list(changed) == [1, 2, 3]
+    sent = json.loads(mock_k1_connector._transport.sendto.call_args_list[1][0][0])
+    assert sent["params"]["data"] == {"cmdId": 29, "device_status": ""}
+
+    # Nothing changed
+    mock_k1_connector._transport.sendto.reset_mock()
+    help_mock_command_reply(mock_k1_connector, MOCK_DEVICE_STATUS_RESPONSE[3:])
+    assert await mock_k1_connector.async_sync_device_status() == {}
+    sent = json.loads(mock_k1_connector._transport.sendto.call_args_list[0][0][0])
+    assert sent["params"]["data"]["device_status"] == get_eq_crc(
+        {1: "0364AAFF", 2: "044B55FF", 3: "0105FEFF"}
+    )
+
+    # Only device 3 changed
+    help_mock_command_reply(
+        mock_k1_connector,
+        [
+            MOCK_DEVICE_STATUS_RESPONSE[2].replace(b"0105FEFF", b"0105AAFF"),
+            MOCK_DEVICE_STATUS_RESPONSE[3],
+        ],
+    )
+    changed = await mock_k1_connector.async_sync_device_status()
+    assert list(changed) == [3]
+    assert changed[3]["device_state"] == "NORMAL"
+
+
+@pytest.mark.asyncio
+async def test_sync_device_status_unsupported_type(mock_k1_connector):
+    """Test a device of an unsupported type is in the CRC vector."""
+    await mock_k1_connector.async_connect()
+
+    unsupported = MOCK_DEVICE_STATUS_RESPONSE[2].replace(
+        b'"device_name" : "0013"', b'"device_name" : "BEEF"'
+    )
+    help_mock_command_reply(
+        mock_k1_connector,
+        MOCK_DEVICE_STATUS_RESPONSE[:2]
+        + [unsupported]
+        + MOCK_DEVICE_STATUS_RESPONSE[3:],
+    )
+    assert list(await mock_k1_connector.async_sync_device_status()) == [1, 2]
+    assert 3 not in mock_k1_connector.device_states
+
+    mock_k1_connector._transport.sendto.reset_mock()
+    help_mock_command_reply(mock_k1_connector, MOCK_DEVICE_STATUS_RESPONSE[3:])
+    assert await mock_k1_connector.async_sync_device_status() == {}
+    sent = json.loads(mock_k1_connector._transport.sendto.call_args_list[0][0][0])
+    assert sent["params"]["data"]["device_status"] == get_eq_crc(
+        {1: "0364AAFF", 2: "044B55FF", 3: "0105FEFF"}
+    )
+
+
+@pytest.mark.asyncio
+@patch("elro.api.TIME_OUT", 0.2)
+async def test_bulk_control(mock_k1_connector):
+    """Test many sockets are switched with pipelined commands."""
+    await mock_k1_connector.async_connect()
+    loop = asyncio.get_running_loop()
+    sent = []
+
+    def sendto(data):
+        """Answer every command but the one for device 3, in order."""
+        if not data.startswith(b"{"):
+            return
+        command = json.loads(data)
+        sent.append(command["params"]["data"])
+        if command["params"]["data"]["device_ID"] != 3:
+            loop.call_later(0.05, mock_k1_connector._protocol.datagram_received, MOCK_SET_EQUIPMENT_RESPONSE[0], None)
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+    start = loop.time()
+    result = await mock_k1_connector.async_bulk_control(
+        [(device_id, SOCKET_ON) for device_id in range(1, 6)], pacing=0.01
+    )
+    # Without msgId echo it is unknown which device did not answer
+    assert result == [None] * 5
+    assert [data["device_ID"] for data in sent] == [1, 2, 3, 4, 5]
+    assert all(data["cmdId"] == SOCKET_ON["cmd_id"].value for data in sent)
+    # Waited for one round trip and the time out of the lost answer, not 5 round trips
+    assert loop.time() - start < 0.5
+    assert Command.ANSWER_YES_OR_NO not in mock_k1_connector._receivers
+
+    with pytest.raises(ValueError):
+        await mock_k1_connector.async_bulk_control([(1, GET_SCENES)])
+
+
+@pytest.mark.asyncio
+@patch("elro.api.TIME_OUT", 0.2)
+async def test_bulk_control_by_msg_id(mock_k1_connector):
+    """Test an answer is matched by msgId once the hub echoes the msgId."""
+    await mock_k1_connector.async_connect()
+    loop = asyncio.get_running_loop()
+    msg_ids = []
+
+    def sendto(data):
+        """Echo the msgId, do not answer the first command of the bulk control."""
+        if not data.startswith(b"{"):
+            return
+        msg_ids.append(json.loads(data)["msgId"])
+        if len(msg_ids) != MSG_ID_ECHO_CHECKS + 1:
+            loop.call_soon(
+                mock_k1_connector._protocol.datagram_received,
+                MOCK_SET_EQUIPMENT_RESPONSE[0].replace(
+                    b'"msgId" : 8', f'"msgId" : {msg_ids[-1]}'.encode()
+                ),
+                None,
+            )
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+    for _ in range(MSG_ID_ECHO_CHECKS):
+        await mock_k1_connector.async_process_command(SOCKET_ON, device_ID=7)
+    result = await mock_k1_connector.async_bulk_control(
+        [(7, SOCKET_ON), (8, SOCKET_OFF)], pacing=0
+    )
+    assert result == [False, True]
+
+
+@pytest.mark.asyncio
+@patch("elro.api.TIME_OUT", 0.2)
+async def test_bulk_control_with_hub_msg_id_counter(mock_k1_connector):
+    """Test answers numbered by the hub counter are not matched by msgId."""
+    await mock_k1_connector.async_connect()
+    loop = asyncio.get_running_loop()
+
+    def sendto(data):
+        """Answer with the next msgId, not for the command of device 3."""
+        if not data.startswith(b"{"):
+            return
+        command = json.loads(data)
+        if command["params"]["data"].get("device_ID") != 3:
+            loop.call_soon(
+                mock_k1_connector._protocol.datagram_received,
+                MOCK_SET_EQUIPMENT_RESPONSE[0].replace(
+                    b'"msgId" : 8', f'"msgId" : {command["msgId"] + 1}'.encode()
+                ),
+                None,
+            )
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+    for _ in range(MSG_ID_ECHO_CHECKS):
+        await mock_k1_connector.async_process_command(SOCKET_ON, device_ID=1)
+    result = await mock_k1_connector.async_bulk_control(
+        [(device_id, SOCKET_ON) for device_id in range(1, 6)], pacing=0
+    )
+    # The answers carry the msgIds of other commands, the lost one is unknown
+    assert result == [None] * 5
+
+
+@pytest.mark.asyncio
+@patch("elro.api.TIME_OUT", 0.2)
+async def test_bulk_control_results_per_command(mock_k1_connector):
+    """Test the results are per command, also for the same device."""
+    await mock_k1_connector.async_connect()
+    loop = asyncio.get_running_loop()
+
+    def sendto(data):
+        """Answer every command without the msgId."""
+        if data.startswith(b"{"):
+            loop.call_soon(
+                mock_k1_connector._protocol.datagram_received,
+                MOCK_SET_EQUIPMENT_RESPONSE[0],
+                None,
+            )
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+    result = await mock_k1_connector.async_bulk_control(
+        [(7, SOCKET_ON), (7, SOCKET_OFF), (8, SOCKET_ON)], pacing=0
+    )
+    assert result == [True, True, True]
+
+    mock_k1_connector._transport.sendto.side_effect = None
+    result = await mock_k1_connector.async_bulk_control(
+        [(7, SOCKET_ON), (7, SOCKET_OFF)], pacing=0
+    )
+    assert result == [False, False]
+
+
+@pytest.mark.asyncio
+async def test_retransmit_idempotent_query(mock_k1_connector):
+    """Test a lost reply to a query is retransmitted after the adaptive time out."""
+    await mock_k1_connector.async_connect()
+    loop = asyncio.get_running_loop()
+    commands = []
+
+    def sendto(data):
+        """Lose the first status request."""
+        if not data.startswith(b"{"):
+            return
+        commands.append(data)
+        if len(commands) == 1:
+            return
+        for frame in MOCK_DEVICE_STATUS_RESPONSE:
+            loop.call_soon(mock_k1_connector._protocol.datagram_received, frame, None)
+
+    mock_k1_connector._transport.sendto.side_effect = sendto
+    estimator = mock_k1_connector._rtt[Command.GET_ALL_EQUIPMENT_STATUS] = RttEstimator(
+        initial=0.05, minimum=0.05
+    )
+    result = await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+    assert len(result) == 3
+    assert commands[0] == commands[1]
+    assert mock_k1_connector.connection_statistics["retransmits"] == 1
+    # The reply of a retransmitted command is not sampled
+    assert estimator.samples == 0
+    assert mock_k1_connector._frame_gap.samples == 3
+
+    mock_k1_connector._transport.sendto.side_effect = None
+    estimator = mock_k1_connector._rtt[Command.EQUIPMENT_CONTROL] = RttEstimator(
+        initial=0.05, minimum=0.05
+    )
+    with pytest.raises(K1.K1ConnectionError):
+        await mock_k1_connector.async_process_command(SOCKET_ON, device_ID=1)
+    assert mock_k1_connector.connection_statistics["retransmits"] == 1
+    assert (
+        mock_k1_connector.round_trip_statistics["EQUIPMENT_CONTROL"]["timeout"] == 0.1
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics(mock_k1_connector):
+    """Test commands are instrumented once metrics are enabled."""
+    await mock_k1_connector.async_connect()
+    assert mock_k1_connector.metrics is None
+    help_mock_command_reply(mock_k1_connector, MOCK_DEVICE_STATUS_RESPONSE)
+    await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+    assert mock_k1_connector.metrics is None
+
+    observed = []
+    metrics = mock_k1_connector.enable_metrics(
+        lambda metric, command, value: observed.append((metric, command))
+    )
+    help_mock_command_reply(
+        mock_k1_connector,
+        [MOCK_DEVICE_STATUS_RESPONSE[0].rstrip()[:-2]]
+        + MOCK_DEVICE_STATUS_RESPONSE[1:]
+        + [b"{ST_answer_OK}"],
+    )
+    await mock_k1_connector.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+    await asyncio.sleep(0.01)
+
+    assert metrics.counters[("acks", "DEVICE_STATUS_UPDATE")] == 4
+    assert metrics.counters[("acks_received", None)] == 1
+    assert metrics.counters[("repairs", None)] == 1
+    assert metrics.histograms[("frames", "GET_ALL_EQUIPMENT_STATUS")].sum == 4
+    assert metrics.histograms[("latency", "GET_ALL_EQUIPMENT_STATUS")].count == 1
+    assert ("latency", "GET_ALL_EQUIPMENT_STATUS") in observed
+    assert "elro_command_latency_seconds_count" in metrics.prometheus_text()
+
+    mock_k1_connector.disable_metrics()
+    assert mock_k1_connector.metrics is None
@@ -3,12 +3,14 @@
 # pylint: disable=line-too-long,redefined-outer-name,protected-access
 
 
+import asyncio
 from unittest.mock import AsyncMock, patch
 
 import json
 import pytest
 
-from elro.auth import ElroConnectsSession
+from elro import auth
+from elro.auth import ElroConnectsSession, async_get_app_domain
 
 MOCK_AUTH_RESPONSE = {
     "access_token": "eyasdfklasdfjalskdfjlasdggffghdfghdf.edsfgsdhJHDkdaskjdksdfyJ1aWQiOiI3OTQ5NjdfghdfghdfghdfghdfghdfghdghfghhgfhhfghfgdhfdgfghdfghzOCwianRpIjoiYTBkNzQxMTctZDQxNi00ZmUwLWI2YWEtNTMxOGUzY2QxYWM3Iiwicm9sZXMiOltdfSAg.B9ESpw7LFzHRFWxrtF44iX3CDNuQcYYAP0BQSZwN_nqOCETsa1xFq961klvPhkfHYilhJWDTqZygNyfYQJUwvg==",
@@ -165,6 +167,24 @@ async def test_login_and_get_device_info(mock_get, mock_post):
     assert connector_list[0]["dev_id"] == MOCK_DEVICE_RESPONSE[0]["devTid"]
     assert connector_list[0]["sw_version"] == MOCK_DEVICE_RESPONSE[0]["binVersion"]
     assert connector_list[0]["online"] is True
+    assert connector_list[0]["ip"] == "10.0.0.1"
+    await cloud_session.async_close()
+
+
+@pytest.mark.parametrize(
+    "connector,ip",
+    [
+        ({"lanIp": "192.168.1.5", "gis": {"ip": {"ip": "10.0.0.1"}}}, "192.168.1.5"),
+        ({"lanIp": None, "gis": {"ip": {"ip": "192.168.1.5"}}}, "192.168.1.5"),
+        # A public address is the WAN address of the network, not of the hub
+        ({"lanIp": None, "gis": {"ip": {"ip": "84.12.34.56"}}}, None),
+        ({"gis": {"ip": {"ip": "not an ip"}}}, None),
+        ({"gis": None}, None),
+    ],
+)
+def test_get_connector_ip(connector, ip):
+    """Test only a LAN or a private geo IP is used as connector IP."""
+    assert auth._get_connector_ip(connector) == ip
 
 
 @pytest.mark.asyncio
@@ -178,3 +198,143 @@ async def test_get_device_info_without_login(mock_get):
     cloud_session = ElroConnectsSession()
     with pytest.raises(ValueError):
         await cloud_session.async_get_connectors()
+
+
+@pytest.mark.asyncio
+async def test_token_refresh_and_session_reuse(mock_get, mock_post):
+    """Test the token is refreshed before it expires on a reused session."""
+    refreshed = {**MOCK_AUTH_RESPONSE, "access_token": "refreshed"}
+    mock_post.return_value.__aenter__.return_value.json = AsyncMock(
+        side_effect=[MOCK_AUTH_RESPONSE, refreshed, {"code": 1200}, MOCK_AUTH_RESPONSE]
+    )
+    mock_get.return_value.__aenter__.return_value.json = AsyncMock(
+        return_value=MOCK_DEVICE_RESPONSE
+    )
+
+    cloud_session = ElroConnectsSession()
+    with patch.object(
+        ElroConnectsSession, "_async_get_domain", AsyncMock(return_value="hekr.me")
+    ):
+        await cloud_session.async_login(MOCK_USER, MOCK_PASSWORD)
+        http_session = cloud_session._http_session
+        await cloud_session.async_get_connectors()
+        assert mock_post.call_count == 1
+
+        # The token is refreshed within the refresh margin
+        cloud_session.session["expires_in"] = 60
+        await cloud_session.async_get_connectors()
+        assert mock_post.call_count == 2
+        assert mock_post.call_args[0][0] == "https://uaa-openapi.hekr.me/token/refresh"
+        assert cloud_session.session["access_token"] == "refreshed"
+        assert cloud_session.token_expires > cloud_session.session["last_login"]
+
+        # A rejected refresh token falls back to a login
+        cloud_session.session["expires_in"] = 0
+        await cloud_session.async_get_connectors()
+        assert mock_post.call_count == 4
+        assert mock_post.call_args[0][0] == "https://uaa-openapi.hekr.me/login"
+        assert cloud_session.session["access_token"] == MOCK_AUTH_RESPONSE["access_token"]
+
+    assert cloud_session._http_session is http_session
+    await cloud_session.async_close()
+    assert http_session.closed
+
+
+async def help_domain_server(
+    replies: list[bytes],
+) -> tuple[asyncio.AbstractServer, list[asyncio.Task]]:
+    """Start a domain server answering in several writes, return its handlers."""
+    handlers = []
+
+    async def handle(reader, writer):
+        handlers.append(asyncio.current_task())
+        assert await reader.readline() == b'{"action":"getAppDomain"}\n'
+        for reply in replies:
+            writer.write(reply)
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        writer.close()
+        await writer.wait_closed()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0), handlers
+
+
+async def help_close_server(
+    server: asyncio.AbstractServer, handlers: list[asyncio.Task]
+) -> None:
+    """Wait for the connection handlers and close the server."""
+    await asyncio.gather(*handlers, return_exceptions=True)
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_get_app_domain(tmp_path):
+    """Test the domain lookup is framed, cached and persisted."""
+    server, handlers = await help_domain_server(
+        [b'{"code": 200, "desc": "success", ', b'"dcInfo": {"domain": "hekreu.me"}}\n']
+    )
+    port = server.sockets[0].getsockname()[1]
+    cache_file = str(tmp_path / "domain.json")
+    with patch.dict(auth._DOMAIN_CACHE, clear=True):
+        assert await async_get_app_domain("127.0.0.1", port, 1, cache_file) == "hekreu.me"
+        await help_close_server(server, handlers)
+        # The cached domain is used without a lookup
+        assert await async_get_app_domain("127.0.0.1", port, 1) == "hekreu.me"
+        auth._DOMAIN_CACHE.clear()
+        # The persisted domain is used after a restart
+        assert await async_get_app_domain("127.0.0.1", port, 1, cache_file) == "hekreu.me"
+        auth._DOMAIN_CACHE.clear()
+        # Failed lookups fall back to the default domain
+        assert await async_get_app_domain("127.0.0.1", port, 1) == auth.DEFAULT_DOMAIN
+
+
+@pytest.mark.asyncio
+async def test_get_app_domain_time_out():
+    """Test a silent domain server times out to the default domain."""
+
+    release = asyncio.Event()
+    handlers = []
+
+    async def handle(reader, writer):
+        handlers.append(asyncio.current_task())
+        await release.wait()
+        writer.close()
+        await writer.wait_closed()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        with patch.dict(auth._DOMAIN_CACHE, clear=True):
+            assert (
+                await async_get_app_domain("127.0.0.1", port, 0.05)
+                == auth.DEFAULT_DOMAIN
+            )
+            assert auth._DOMAIN_CACHE[("127.0.0.1", port)][0] == auth.DEFAULT_DOMAIN
+    finally:
+        release.set()
+        await help_close_server(server, handlers)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_token_refresh(mock_get, mock_post):
+    """Test concurrent requests share one token refresh."""
+    mock_post.return_value.__aenter__.return_value.json = AsyncMock(
+        side_effect=[MOCK_AUTH_RESPONSE, {**MOCK_AUTH_RESPONSE, "access_token": "new"}]
+    )
+    mock_get.return_value.__aenter__.return_value.json = AsyncMock(
+        return_value=MOCK_DEVICE_RESPONSE
+    )
+    with patch.object(
+        ElroConnectsSession, "_async_get_domain", AsyncMock(return_value="hekr.me")
+    ):
+        async with ElroConnectsSession() as cloud_session:
+            await cloud_session.async_login(MOCK_USER, MOCK_PASSWORD)
+            http_session = cloud_session._http_session
+            cloud_session.session["expires_in"] = 0
+            await asyncio.gather(
+                *(cloud_session.async_get_connectors() for _ in range(5))
+            )
+            assert mock_post.call_count == 2
+            assert cloud_session.session["access_token"] == "new"
+    assert http_session.closed
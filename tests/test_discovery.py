@@ -0,0 +1,62 @@
+"""Test the discovery of connectors on the local network."""
+
+import asyncio
+
+import pytest
+
+from elro.discovery import async_discover_connectors, parse_handshake_reply
+
+from tests.test_endpoint import HubMock
+
+
+def test_parse_handshake_reply():
+    """Test the connector is parsed from a handshake reply."""
+    connector = parse_handshake_reply(
+        b"NAME:ST_deadbeef0000\nBIND:0\nKEY:deadbeef\n", ("10.0.0.1", 1025)
+    )
+    assert connector.connector_id == "ST_deadbeef0000"
+    assert (connector.host, connector.port) == ("10.0.0.1", 1025)
+    assert (connector.bind_key, connector.api_key) == ("0", "deadbeef")
+    assert parse_handshake_reply(b"{ST_answer_OK}", ("10.0.0.1", 1025)) is None
+
+
+@pytest.mark.asyncio
+async def test_sweep():
+    """Test a sweep finds the hub and skips silent hosts."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: HubMock("ST_deadbeef0000", "0364AAFF"), local_addr=("127.0.0.1", 0)
+    )
+    port = transport.get_extra_info("sockname")[1]
+    try:
+        start = loop.time()
+        connectors = await async_discover_connectors(
+            "127.0.0.0/29", port=port, timeout=0.2, max_in_flight=8
+        )
+        # All hosts are probed in one window
+        assert loop.time() - start < 1
+    finally:
+        transport.close()
+    assert list(connectors) == ["ST_deadbeef0000"]
+    assert connectors["ST_deadbeef0000"].host == "127.0.0.1"
+    assert connectors["ST_deadbeef0000"].api_key == "deadbeef012345678deadbeef0123456"
+
+
+@pytest.mark.asyncio
+async def test_probe_host_name():
+    """Test the reply to a probe of a host name wakes up the probe."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: HubMock("ST_deadbeef0000", "0364AAFF"), local_addr=("127.0.0.1", 0)
+    )
+    port = transport.get_extra_info("sockname")[1]
+    try:
+        start = loop.time()
+        connectors = await async_discover_connectors(
+            ["localhost", "unknown.invalid"], port=port, timeout=2
+        )
+        # The probe does not wait for the time out
+        assert loop.time() - start < 1
+    finally:
+        transport.close()
+    assert connectors["ST_deadbeef0000"].host == "127.0.0.1"
@@ -0,0 +1,161 @@
+"""Test sharing one UDP socket between K1 hubs."""
+
+# pylint: disable=protected-access
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from elro.api import K1
+from elro.command import GET_ALL_EQUIPMENT_STATUS
+from elro.endpoint import K1SharedEndpoint, get_dev_tid
+
+STATUS_REPLY = (
+    '{"msgId" : 1,"action" : "devSend","params" : {"devTid" : "%s","appTid" :  [],'
+    '"data" : {"cmdId" : 19,"device_ID" : %s,"device_name" : "0013","device_status" : "%s" }}}\n'
+)
+
+
+class HubMock(asyncio.DatagramProtocol):
+    """Hub answering the handshake and status requests."""
+
+    def __init__(self, k1_id: str, device_status: str) -> None:
+        """Initialize the hub."""
+        self.k1_id = k1_id
+        self.device_status = device_status
+        self.peers = set()
+        self.transport = None
+
+    def connection_made(self, transport):
+        """Connection made."""
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        """Reply to the handshake and to GET_ALL_EQUIPMENT_STATUS."""
+        self.peers.add(addr)
+        message = data.decode("utf-8")
+        if message.startswith("IOT_KEY?"):
+            self.transport.sendto(
+                f"NAME:{self.k1_id}\nKEY:deadbeef012345678deadbeef0123456\n".encode(),
+                addr,
+            )
+        elif message.startswith("{") and json.loads(message)["params"]["data"][
+            "cmdId"
+        ] == 15:
+            for frame in (
+                STATUS_REPLY % (self.k1_id, 1, self.device_status),
+                STATUS_REPLY % (self.k1_id, 65535, "OVER"),
+            ):
+                self.transport.sendto(frame.encode(), addr)
+
+
+def test_get_dev_tid():
+    """Test the connector id is found in handshake replies and frames."""
+    assert get_dev_tid(b"NAME:ST_1234567890ab\nBIND:0\n") == "ST_1234567890ab"
+    assert get_dev_tid((STATUS_REPLY % ("ST_1", 1, "OVER")).encode()) == "ST_1"
+    assert get_dev_tid(b"{ST_answer_OK}") is None
+
+
+@pytest.mark.asyncio
+async def test_hubs_share_one_socket():
+    """Test two hubs are polled over one socket."""
+    loop = asyncio.get_running_loop()
+    servers = []
+    hubs = []
+    endpoint = K1SharedEndpoint(("127.0.0.1", 0))
+    for k1_id, device_status in (
+        ("ST_000000000001", "0364AAFF"),
+        ("ST_000000000002", "044B55FF"),
+    ):
+        transport, hub_mock = await loop.create_datagram_endpoint(
+            lambda k1_id=k1_id, device_status=device_status: HubMock(
+                k1_id, device_status
+            ),
+            local_addr=("127.0.0.1", 0),
+        )
+        servers.append((transport, hub_mock))
+        port = transport.get_extra_info("sockname")[1]
+        hubs.append(K1("127.0.0.1", k1_id, port=port, endpoint=endpoint))
+    try:
+        results = await asyncio.gather(
+            *(hub.async_process_command(GET_ALL_EQUIPMENT_STATUS) for hub in hubs)
+        )
+        assert results[0][1]["device_status_data"]["device_status"] == "0364AAFF"
+        assert results[1][1]["device_status_data"]["device_status"] == "044B55FF"
+        assert endpoint.hub_count == 2
+        # Both hubs saw the same local socket
+        assert servers[0][1].peers == servers[1][1].peers
+        assert len(servers[0][1].peers) == 1
+
+        await hubs[0].async_disconnect()
+        assert endpoint.hub_count == 1
+        # The shared socket stays open for the other hub
+        result = await hubs[1].async_process_command(GET_ALL_EQUIPMENT_STATUS)
+        assert result[1]["device_status_data"]["device_status"] == "044B55FF"
+    finally:
+        for hub in hubs:
+            await hub.async_disconnect()
+        endpoint.close()
+        for transport, _ in servers:
+            transport.close()
+
+
+@pytest.mark.asyncio
+async def test_route_by_dev_tid():
+    """Test frames from one address are routed by devTid."""
+    endpoint = K1SharedEndpoint()
+    endpoint.connection_made(MagicMock())
+    protocols = {}
+    for k1_id in ("ST_000000000001", "ST_000000000002"):
+        protocols[k1_id] = MagicMock()
+        await endpoint.async_create_endpoint(
+            lambda k1_id=k1_id: protocols[k1_id], ("127.0.0.1", 1025), k1_id
+        )
+    addr = ("127.0.0.1", 1025)
+    frame = (STATUS_REPLY % ("ST_000000000002", 1, "OVER")).encode()
+    endpoint.datagram_received(frame, addr)
+    protocols["ST_000000000001"].datagram_received.assert_not_called()
+    protocols["ST_000000000002"].datagram_received.assert_called_once_with(frame, addr)
+
+    endpoint.datagram_received(b"{ST_answer_OK}", addr)
+    assert protocols["ST_000000000001"].datagram_received.call_count == 1
+
+    endpoint.datagram_received(frame, ("127.0.0.9", 1025))
+    endpoint.datagram_received(
+        (STATUS_REPLY % ("ST_000000000003", 1, "OVER")).encode(), addr
+    )
+    assert endpoint.unrouted == 2
+
+    endpoint.connection_lost(None)
+    assert endpoint.hub_count == 0
+    for protocol in protocols.values():
+        protocol.connection_lost.assert_called_once_with(None)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_open():
+    """Test hubs connecting at the same time open one socket."""
+    loop = asyncio.get_running_loop()
+    endpoint = K1SharedEndpoint(("127.0.0.1", 0))
+    create_datagram_endpoint = loop.create_datagram_endpoint
+    opened = []
+
+    async def _create_datagram_endpoint(*args, **kwargs):
+        """Count the opened sockets."""
+        opened.append(await create_datagram_endpoint(*args, **kwargs))
+        return opened[-1]
+
+    with patch.object(loop, "create_datagram_endpoint", _create_datagram_endpoint):
+        await asyncio.gather(
+            *(
+                endpoint.async_create_endpoint(
+                    MagicMock, ("127.0.0.1", 1025), f"ST_{index:012x}"
+                )
+                for index in range(20)
+            )
+        )
+    assert len(opened) == 1
+    assert endpoint.hub_count == 20
+    endpoint.close()
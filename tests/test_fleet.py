@@ -0,0 +1,98 @@
+"""Test polling a fleet of K1 hubs."""
+
+# pylint: disable=protected-access
+
+import asyncio
+
+import pytest
+
+from elro.api import K1
+from elro.fleet import K1Fleet
+
+
+@pytest.mark.asyncio
+async def test_dead_hub_does_not_starve_fleet():
+    """Test a hub that does not answer does not block the other hubs."""
+    dead_hub = K1("127.0.0.1", "ST_dead00000000")
+    live_hub = K1("127.0.0.2", "ST_beef00000000")
+    updates = []
+
+    async def poll(hub: K1) -> str:
+        """Poll, the dead hub never replies."""
+        if hub is dead_hub:
+            await asyncio.sleep(10)
+        return hub._k1_id
+
+    fleet = K1Fleet(
+        interval=0.01,
+        max_concurrent=1,
+        poll_timeout=0.05,
+        poll=poll,
+        on_update=lambda hub_id, result: updates.append((hub_id, result)),
+    )
+    fleet.add_hub("dead", dead_hub)
+    fleet.add_hub("live", live_hub)
+    await fleet.async_start()
+    await asyncio.sleep(0.3)
+    await fleet.async_stop()
+
+    assert fleet.statistics["dead"].polls == 0
+    assert fleet.statistics["dead"].errors >= 1
+    assert fleet.statistics["dead"].last_error == "TimeoutError"
+    assert fleet.statistics["live"].polls >= 3
+    assert fleet.statistics["live"].average_latency < 0.05
+    assert set(updates) == {("live", "ST_beef00000000")}
+
+    stats = fleet.aggregate_statistics
+    assert stats["hubs"] == 2
+    assert stats["failing_hubs"] == 1
+    assert stats["polls"] == fleet.statistics["live"].polls
+
+
+@pytest.mark.asyncio
+async def test_add_and_remove_hub():
+    """Test hubs can be added to and removed from a running fleet."""
+    polled = asyncio.Event()
+
+    async def poll(hub: K1) -> None:
+        """Signal the poll."""
+        polled.set()
+
+    fleet = K1Fleet(interval=0.01, poll=poll)
+    await fleet.async_start()
+    fleet.add_hub("hub", K1("127.0.0.1", "ST_beef00000000"))
+    await asyncio.wait_for(polled.wait(), 1)
+
+    with pytest.raises(ValueError):
+        fleet.add_hub("hub", K1("127.0.0.1", "ST_beef00000000"))
+    assert len(fleet._tasks) == 1
+
+    await fleet.async_remove_hub("hub")
+    assert not fleet.hubs
+    assert not fleet.statistics
+    await fleet.async_stop()
+
+
+@pytest.mark.asyncio
+async def test_failing_update_callback(caplog):
+    """Test a failing update callback does not stop polling the hub."""
+    updates = []
+
+    def on_update(hub_id: str, result: None) -> None:
+        """Fail on every update."""
+        updates.append(hub_id)
+        raise RuntimeError("Callback failed")
+
+    async def poll(hub: K1) -> None:
+        """Poll."""
+
+    fleet = K1Fleet(interval=0.01, poll=poll, on_update=on_update)
+    fleet.add_hub("hub", K1("127.0.0.1", "ST_beef00000000"))
+    await fleet.async_start()
+    await asyncio.sleep(0.1)
+    assert not fleet._tasks["hub"].done()
+    await fleet.async_stop()
+
+    assert len(updates) >= 2
+    assert fleet.statistics["hub"].polls == len(updates)
+    assert "Error in the update callback of hub hub" in caplog.text
@@ -0,0 +1,114 @@
+"""Test the elro connects frame parser."""
+
+import json
+
+import pytest
+
+from elro.command import (
+    GET_ALL_EQUIPMENT_STATUS,
+    GET_SCENES,
+    SET_DEVICE_NAME,
+    SOCKET_OFF,
+    SOCKET_ON,
+    SYN_DEVICE_STATUS,
+)
+from elro.frame import (
+    FRAME_TEMPLATE_CACHE_SIZE,
+    FrameBuilder,
+    FrameType,
+    classify_frame,
+    parse_frame,
+)
+from elro.utils import validate_json
+
+from .test_api import MOCK_DEVICE_STATUS_RESPONSE, MOCK_SCENE_RESPONSE
+
+TRUNCATED_FRAME = b'{"msgId" : 3644,"action" : "devSend","params" : {"devTid" : "ST_1234567890ab","appTid" :  [],"data" : {"cmdId" : 19,"device_ID" : 1,"device_name" : "0013","device_status" : "0364AAFF" }\n'
+
+
+@pytest.mark.parametrize("data", [b"{ST_answer_OK}", b"{st_answer_ok}\n"])
+def test_ack_frame(data: bytes):
+    """Test acknowledgements are classified without parsing."""
+    assert parse_frame(data) == (FrameType.ACK, None)
+
+
+@pytest.mark.parametrize("data", MOCK_DEVICE_STATUS_RESPONSE + MOCK_SCENE_RESPONSE)
+def test_json_frame(data: bytes):
+    """Test the captured frames parse like json.loads."""
+    frame_type, frame = parse_frame(data)
+    assert frame_type == FrameType.JSON
+    assert frame == validate_json(data)
+    assert frame["params"]["data"]["cmdId"] in (19, 26, 27)
+
+
+def test_truncated_frame():
+    """Test a frame missing its closing brackets is repaired."""
+    assert classify_frame(TRUNCATED_FRAME)[0] == FrameType.TRUNCATED
+    frame_type, frame = parse_frame(TRUNCATED_FRAME)
+    assert frame_type == FrameType.TRUNCATED
+    assert frame == parse_frame(MOCK_DEVICE_STATUS_RESPONSE[0])[1]
+    assert validate_json(TRUNCATED_FRAME) == frame
+
+
+@pytest.mark.parametrize("data", [b"NAME:ST_1234567890ab\n", b"{\"msgId\" : }", b"[]"])
+def test_invalid_frame(data: bytes):
+    """Test invalid frames raise a ValueError."""
+    with pytest.raises(ValueError):
+        parse_frame(data)
+
+
+@pytest.mark.parametrize(
+    "attributes,argv",
+    [
+        (SOCKET_ON, {"device_ID": 5}),
+        (SOCKET_OFF, {"device_ID": 65535}),
+        (SYN_DEVICE_STATUS, {"device_status": "0008DEAD0000BEEF"}),
+        (SYN_DEVICE_STATUS, {"device_status": ""}),
+        (GET_ALL_EQUIPMENT_STATUS, {}),
+        (GET_SCENES, {"sence_group": 2}),
+        (SET_DEVICE_NAME, {"device_ID": 3, "device_name": 'Café "x"'}),
+        (SOCKET_ON, {"device_ID": 1, "extra": True, "other": None}),
+    ],
+)
+def test_frame_builder(attributes, argv):
+    """Test built frames are equal to json.dumps of the command."""
+    builder = FrameBuilder("ST_1234567890ab", "deadbeef012345678deadbeef0123456")
+    for msg_id in (1, 2):
+        expected = {
+            "msgId": msg_id,
+            "action": "appSend",
+            "params": {
+                "devTid": "ST_1234567890ab",
+                "ctrlKey": "deadbeef012345678deadbeef0123456",
+                "appTid": 1,
+                "data": {
+                    "cmdId": attributes["cmd_id"].value,
+                    **attributes["additional_attributes"],
+                    **argv,
+                },
+            },
+        }
+        assert builder.build(
+            msg_id,
+            attributes["cmd_id"].value,
+            attributes["additional_attributes"],
+            argv,
+        ) == json.dumps(expected).encode("utf-8")
+
+
+def test_frame_builder_template_cache_is_bounded():
+    """Test templates of short lived attributes do not grow the cache."""
+    builder = FrameBuilder("ST_1234567890ab", "deadbeef012345678deadbeef0123456")
+    socket_on = SOCKET_ON["additional_attributes"]
+    builder.build(1, 1, socket_on, {"device_ID": 1})
+    for msg_id in range(2 * FRAME_TEMPLATE_CACHE_SIZE):
+        builder.build(msg_id, 1, {"device_status": f"{msg_id:08X}"}, {})
+        # A template in use is kept
+        builder.build(msg_id, 1, socket_on, {"device_ID": 1})
+    assert len(builder._templates) == FRAME_TEMPLATE_CACHE_SIZE
+    assert (1, id(socket_on), ("device_ID",)) in builder._templates
+    assert builder.build(1, 1, {"device_status": "BEEF"}, {}) == (
+        b'{"msgId": 1, "action": "appSend", "params": {"devTid": "ST_1234567890ab", '
+        b'"ctrlKey": "deadbeef012345678deadbeef0123456", "appTid": 1, '
+        b'"data": {"cmdId": 1, "device_status": "BEEF"}}}'
+    )
@@ -0,0 +1,51 @@
+"""Test the elro connects instrumentation."""
+
+from elro.metrics import (
+    Histogram,
+    K1Metrics,
+    METRIC_ACKS,
+    METRIC_RECONNECTS,
+    render_prometheus,
+)
+
+
+def test_histogram():
+    """Test the cumulative bucket counts."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+
+
+def test_sinks_and_prometheus_text():
+    """Test observations reach the sinks and the text exposition."""
+    observed = []
+    metrics = K1Metrics("ST_1")
+    remove = metrics.add_sink(lambda *args: observed.append(args))
+    metrics.count(METRIC_ACKS, "DEVICE_STATUS_UPDATE")
+    metrics.observe_command("GET_ALL_EQUIPMENT_STATUS", 0.02, 4)
+    remove()
+    metrics.count(METRIC_RECONNECTS)
+    assert observed == [
+        ("acks", "DEVICE_STATUS_UPDATE", 1),
+        ("latency", "GET_ALL_EQUIPMENT_STATUS", 0.02),
+        ("frames", "GET_ALL_EQUIPMENT_STATUS", 4),
+    ]
+
+    other = K1Metrics("ST_2")
+    other.count(METRIC_RECONNECTS)
+    text = render_prometheus([metrics, other])
+    assert text.count("# TYPE elro_reconnects_total counter") == 1
+    assert 'elro_reconnects_total{hub="ST_2"} 1' in text
+    assert 'elro_acks_sent_total{hub="ST_1",command="DEVICE_STATUS_UPDATE"} 1' in text
+    assert (
+        'elro_command_latency_seconds_bucket{hub="ST_1",'
+        'command="GET_ALL_EQUIPMENT_STATUS",le="0.025"} 1'
+    ) in text
+    assert (
+        'elro_command_frames_count{hub="ST_1",command="GET_ALL_EQUIPMENT_STATUS"} 1'
+    ) in text
+    assert metrics.prometheus_text().startswith("# HELP elro_command_latency_seconds")
+    assert K1Metrics("ST_3").prometheus_text() == ""
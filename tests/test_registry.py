@@ -0,0 +1,75 @@
+"""Test the connector registry."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from elro.auth import ElroConnectsConnector
+from elro.registry import ConnectorRegistry
+
+
+def help_connector(dev_id: str, ip: str = "10.0.0.1", **kwargs) -> ElroConnectsConnector:
+    """Return a connector."""
+    return ElroConnectsConnector(
+        **{
+            "dev_id": dev_id,
+            "ctrl_key": "deadbeef",
+            "bind_key": "beefdead",
+            "mac": "deadbeef012",
+            "data_center": "fra",
+            "data_center_area": "eu",
+            "sw_version": "2.0.3.30",
+            "model": "188A",
+            "online": True,
+            "ip": ip,
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_and_configure_changed_hubs():
+    """Test only added or changed connectors reconfigure their hub."""
+    session = MagicMock()
+    session.async_get_connectors = AsyncMock(
+        side_effect=[
+            [help_connector("ST_1"), help_connector("ST_2"), help_connector("ST_3")],
+            [
+                help_connector("ST_1", sw_version="2.0.3.31"),
+                help_connector("ST_2", ip="10.0.0.2"),
+                help_connector("ST_4", online=False),
+            ],
+        ]
+    )
+    hubs = {dev_id: MagicMock(async_configure=AsyncMock()) for dev_id in ("ST_1", "ST_2")}
+    registry = ConnectorRegistry(session, ttl=60)
+
+    assert await registry.async_configure_hubs(hubs) == ["ST_1", "ST_2"]
+    assert registry.get("ST_3")["ip"] == "10.0.0.1"
+    # The cached list is used until the ttl expires
+    assert not await registry.async_refresh()
+    assert session.async_get_connectors.call_count == 1
+
+    hubs["ST_2"].async_configure.reset_mock()
+    registry.invalidate()
+    assert await registry.async_configure_hubs(hubs) == ["ST_2"]
+    hubs["ST_2"].async_configure.assert_awaited_once_with("10.0.0.2", api_key="deadbeef")
+    hubs["ST_1"].async_configure.assert_awaited_once()
+    assert registry.get("ST_3") is None
+    assert set(registry.connectors) == {"ST_1", "ST_2", "ST_4"}
+
+
+def test_update_diff():
+    """Test the differences reported by an update."""
+    registry = ConnectorRegistry(MagicMock())
+    assert registry.expired
+    registry.update([help_connector("ST_1"), help_connector("ST_2")])
+    assert not registry.expired
+
+    diff = registry.update(
+        [help_connector("ST_1", ctrl_key="cafe"), help_connector("ST_3")]
+    )
+    assert list(diff.added) == ["ST_3"]
+    assert list(diff.removed) == ["ST_2"]
+    assert list(diff.changed) == ["ST_1"]
+    assert not registry.update(list(registry.connectors.values()))
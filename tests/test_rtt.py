@@ -0,0 +1,28 @@
+"""Test the round trip time estimator."""
+
+import pytest
+
+from elro.rtt import RttEstimator
+
+
+def test_rtt_estimator():
+    """Test the time out follows the measured round trip times."""
+    estimator = RttEstimator(initial=3.0, minimum=0.2)
+    assert estimator.timeout(10) == 3.0
+    assert estimator.timeout(1) == 1
+
+    estimator.add_sample(0.1)
+    assert estimator.srtt == 0.1
+    assert estimator.rttvar == 0.05
+    assert estimator.timeout(10) == pytest.approx(0.3)
+
+    for _ in range(50):
+        estimator.add_sample(0.1)
+    assert estimator.timeout(10) == 0.2
+    assert estimator.samples == 51
+
+    estimator.backoff()
+    estimator.backoff()
+    assert estimator.timeout(10) == 0.8
+    estimator.add_sample(0.1)
+    assert estimator.timeout(10) == 0.2
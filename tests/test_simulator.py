@@ -0,0 +1,140 @@
+"""Test the K1 against the simulated hub."""
+
+import asyncio
+import json
+
+import pytest
+
+from elro.api import K1
+from elro.command import (
+    GET_ALL_EQUIPMENT_STATUS,
+    GET_SCENES,
+    SET_DEVICE_NAME,
+    SOCKET_ON,
+    TEST_ALARM,
+)
+from elro.event import K1Event
+from elro.simulator import K1Simulator, SimulatedDevice
+
+K1_ID = "ST_1234567890ab"
+
+
+@pytest.mark.asyncio
+async def test_commands():
+    """Test the commands are answered like the hub does."""
+    simulator = K1Simulator(
+        K1_ID,
+        [SimulatedDevice(1), SimulatedDevice(2, "1200", "04FF0100", "Socket")],
+        ack_pacing=True,
+        scenes=2,
+    )
+    host, port = await simulator.async_start()
+    hub = K1(host, K1_ID, port=port)
+    try:
+        await hub.async_connect()
+        states = await hub.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+        assert states[1]["device_type"] == "FIRE_ALARM"
+        assert states[2]["device_value"] == "off"
+
+        await hub.async_process_command(SOCKET_ON, device_ID=2)
+        await hub.async_process_command(SET_DEVICE_NAME, device_ID=1, device_name="Barn")
+        # Only the switched socket is reported by a status sync
+        assert list(await hub.async_sync_device_status()) == [2]
+        assert hub.device_states.get(2)["device_value"] == "on"
+        assert await hub.async_get_device_names(refresh=True) == {
+            1: {"name": "Barn"},
+            2: {"name": "Socket"},
+        }
+        assert len(await hub.async_process_command(GET_SCENES)) == 2
+    finally:
+        await hub.async_disconnect()
+        simulator.close()
+
+
+@pytest.mark.asyncio
+async def test_alarm_push():
+    """Test a tested alarm is pushed to the event stream."""
+    simulator = K1Simulator(K1_ID, devices=3, latency=0.005, jitter=0.005, seed=1)
+    host, port = await simulator.async_start()
+    hub = K1(host, K1_ID, port=port)
+    events = hub.async_events()
+    try:
+        receive = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.05)
+        await hub.async_process_command(TEST_ALARM, device_ID=3)
+        event: K1Event = await asyncio.wait_for(receive, 1)
+        assert event.device_id == 3
+        assert event.state["device_state"] == "TEST ALARM"
+        assert simulator.statistics["alarms"] == 1
+    finally:
+        await events.aclose()
+        await hub.async_disconnect()
+        simulator.close()
+
+
+@pytest.mark.asyncio
+async def test_loss_and_reordering():
+    """Test queries survive a lossy hub with reordered frames."""
+    simulator = K1Simulator(
+        K1_ID, devices=20, frame_interval=0.001, loss=0.05, reorder=0.2, seed=3
+    )
+    host, port = await simulator.async_start()
+    hub = K1(host, K1_ID, port=port)
+    answered = 0
+    try:
+        for _ in range(10):
+            try:
+                states = await hub.async_process_command(GET_ALL_EQUIPMENT_STATUS)
+            except K1.K1ConnectionError:
+                continue
+            answered += 1
+            assert set(states) <= set(range(1, 21))
+    finally:
+        await hub.async_disconnect()
+        simulator.close()
+    assert answered
+    assert simulator.statistics["dropped"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("echo_msg_id", [False, True])
+async def test_msg_id(echo_msg_id: bool):
+    """Test replies carry the hub counter unless the msgId is echoed."""
+    simulator = K1Simulator(K1_ID, devices=2, echo_msg_id=echo_msg_id)
+    host, port = await simulator.async_start()
+    replies: asyncio.Queue[bytes] = asyncio.Queue()
+
+    class _Client(asyncio.DatagramProtocol):
+        """Queue the received datagrams."""
+
+        def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+            """Queue a datagram."""
+            replies.put_nowait(data)
+
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        _Client, remote_addr=(host, port)
+    )
+    try:
+        transport.sendto(
+            json.dumps(
+                {
+                    "msgId": 1,
+                    "action": "appSend",
+                    "params": {
+                        "devTid": K1_ID,
+                        "ctrlKey": simulator.ctrl_key,
+                        "appTid": 1,
+                        "data": {"cmdId": 15, "device_status": ""},
+                    },
+                }
+            ).encode()
+        )
+        frames = []
+        while len(frames) < 3:
+            if (data := await asyncio.wait_for(replies.get(), 1)).startswith(b'{"'):
+                frames.append(json.loads(data))
+    finally:
+        transport.close()
+        simulator.close()
+    msg_ids = [frame["msgId"] for frame in frames]
+    assert msg_ids == ([1, 1, 1] if echo_msg_id else [3641, 3642, 3643])
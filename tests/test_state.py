@@ -0,0 +1,132 @@
+"""Test the device state store."""
+
+import copy
+
+import pytest
+
+from elro.state import DeviceNameCache, DeviceStateStore
+from elro.utils import get_device_state, get_device_states, update_state_data
+
+
+def test_update_and_changed_since():
+    """Test only changed devices get a new version."""
+    store = DeviceStateStore()
+
+    assert store.update({1: {"device_state": "NORMAL"}, 2: {"device_state": "OPEN"}}) == [1, 2]
+    assert store.version == 2
+    version = store.version
+
+    assert store.update({1: {"device_state": "NORMAL"}, 2: {"device_state": "CLOSED"}}) == [2]
+    assert store.version == 3
+    assert store.changed_since(version) == {2: {"device_state": "CLOSED"}}
+    assert store.changed_since(store.version) == {}
+    assert store.device_version(1) == 1
+    assert store.device_version(2) == 3
+    assert store.last_updated(2) >= store.last_updated(1)
+
+
+def test_merge_names():
+    """Test names are merged into the existing state."""
+    store = DeviceStateStore()
+    store.update({1: {"device_state": "NORMAL"}})
+    store.update({1: {"name": "Kitchen"}, 3: {"name": "Barn"}})
+
+    assert store.get(1) == {"device_state": "NORMAL", "name": "Kitchen"}
+    # A name without a state is kept aside until the state arrives
+    assert store.get(3) is None
+    assert 3 not in store
+    assert len(store) == 1
+    assert store.changed_since(0) == {1: {"device_state": "NORMAL", "name": "Kitchen"}}
+
+    status = {"device_ID": 3, "device_name": "0013", "device_status": "0364AAFF"}
+    assert store.update(get_device_states([status])) == [3]
+    assert store.get(3).name == "Barn"
+    assert store.get(3)["device_state"] == "NORMAL"
+
+    store.clear()
+    assert not store.states
+    assert store.version == 3
+
+
+def test_name_cache():
+    """Test the name cache hits, misses and invalidation."""
+    cache = DeviceNameCache()
+    assert cache.get() is None
+    cache.update({1: {"name": "Kitchen"}, 2: {"name": "Barn"}})
+    cache.set_name(2, "Garage")
+    assert cache.get() == {1: {"name": "Kitchen"}, 2: {"name": "Garage"}}
+
+    cache.check_device(2)
+    assert cache.valid
+    cache.check_device(3)
+    assert not cache.valid
+    assert cache.get() is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_device_state_records():
+    """Test parsed states are shared records with a dict view."""
+    status = {"device_ID": 1, "device_name": "0013", "device_status": "0364AAFF"}
+    state = get_device_states([status])[1]
+    assert get_device_states([dict(status)])[1] is state
+    assert state.battery == 100
+    assert state["device_state"] == "NORMAL"
+    assert state["device_status_data"] == status
+    assert "name" not in state
+    assert state == {
+        "device_type": "FIRE_ALARM",
+        "signal": 3,
+        "battery": 100,
+        "device_state": "NORMAL",
+        "device_value": "0xff",
+        "device_status_data": status,
+        "device_value_data": 255,
+    }
+
+    store = DeviceStateStore()
+    store.update({1: {"name": "Kitchen"}})
+    assert store.update({1: state}) == [1]
+    assert store.get(1)["name"] == "Kitchen"
+    assert store.get(1).same_status(state)
+    # The same status does not change the device
+    assert store.update(get_device_states([status])) == []
+    assert store.update({1: {"name": "Barn"}}) == [1]
+    assert store.get(1).name == "Barn"
+    assert state.name is None
+    assert store.update({1: get_device_state(1, "0013", "0364AA00")}) == [1]
+    assert store.get(1)["device_value"] == "off"
+    assert store.get(1)["name"] == "Barn"
+
+
+def test_update_state_data_with_records():
+    """Test names are merged into parsed states like into the original dicts."""
+    status = {"device_ID": 1, "device_name": "0013", "device_status": "0364AAFF"}
+    data = get_device_states([status, {**status, "device_ID": 2}])
+    shared = data[1]
+    update_state_data(data, {1: {"name": "Kitchen"}, 3: {"name": "Barn"}})
+    assert data[1]["name"] == "Kitchen"
+    assert data[1]["device_state"] == "NORMAL"
+    assert "name" not in data[2]
+    assert data[3] == {"name": "Barn"}
+    # The shared record is not changed
+    assert shared.name is None
+    assert get_device_states([status])[1] is shared
+
+    # A status update keeps the name
+    update_state_data(
+        data, get_device_states([{**status, "device_status": "0364AA01"}])
+    )
+    assert data[1]["name"] == "Kitchen"
+    assert data[1]["device_value"] == "on"
+
+
+def test_device_state_is_read_only():
+    """Test the shared records cannot be changed."""
+    state = get_device_state(1, "0013", "0364AAFF")
+    with pytest.raises(AttributeError):
+        state.name = "Kitchen"
+    with pytest.raises(AttributeError):
+        del state.battery
+    assert copy.copy(state) == state
+    assert state.with_name("Kitchen").name == "Kitchen"
+    assert state.name is None
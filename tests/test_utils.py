@@ -0,0 +1,118 @@
+"""Test the elro connects utilities."""
+
+import pytest
+
+from elro.utils import (
+    check_alarm_trigger_crc,
+    crc16,
+    crc16_hex,
+    crc_maker,
+    crc_maker_char,
+    decode_device_name,
+    encode_device_name,
+    get_ascii,
+    get_device_state,
+    get_device_names,
+    get_eq_crc,
+    set_device_name,
+)
+
+
+@pytest.mark.parametrize(
+    "hex_string,crc",
+    [
+        ("", "FFFF"),
+        ("0364AAFF", crc_maker_char("0364aaff")),
+        ("000BAD00030013046419A5", "51EA"),
+    ],
+)
+def test_crc16_hex(hex_string: str, crc: str):
+    """Test the CRC of hex strings."""
+    assert crc16_hex(hex_string) == crc
+    assert crc_maker_char(hex_string) == crc
+    # The trailing nibble is ignored
+    assert crc16_hex(hex_string + "F") == crc
+
+
+def test_crc16_bytes():
+    """Test the CRC engine works on bytes, memoryview and strings alike."""
+    data = bytes.fromhex(get_ascii("Zolder"))
+    assert f"{crc16(data):04X}" == crc16_hex(data.hex())
+    assert crc16(memoryview(data)) == crc16(data)
+    assert crc_maker(data.decode("latin-1")) == crc16_hex(data.hex())
+    # Standard CRC16/MODBUS check value, with the byte order the hub uses
+    assert crc16(b"123456789") == 0x4B37
+
+
+def test_check_alarm_trigger_crc():
+    """Test the CRC of a DEVICE_ALARM_TRIGGER answer_content."""
+    assert check_alarm_trigger_crc("000BAD00030013046419A551EA")
+    assert check_alarm_trigger_crc("000BAD00030013046419A551ea")
+    assert not check_alarm_trigger_crc("000BAD00030013046419A651EA")
+
+
+def test_get_eq_crc():
+    """Test the CRC vector of a sparse device table."""
+    assert get_eq_crc({1: "0364AAFF", 3: "0105FEFF"}) == (
+        "0008" + crc16_hex("0364AAFF") + "0000" + crc16_hex("0105FEFF")
+    )
+    # Device ids are slots, the length is derived from the highest id
+    devices = {device_id: "044B55FF" for device_id in range(10, 400, 5)}
+    eq_crc = get_eq_crc(devices)
+    assert eq_crc[:4] == f"{395 * 2 + 2:04x}"
+    assert len(eq_crc) == 4 + 395 * 4
+    assert eq_crc[4 + 9 * 4 : 4 + 10 * 4] == crc16_hex("044B55FF")
+    assert eq_crc[4 : 4 + 9 * 4] == "0000" * 9
+
+
+@pytest.mark.parametrize(
+    "device_name,device_status,expected",
+    [
+        ("0013", "0364AAFF", ("FIRE_ALARM", 3, 100, "NORMAL", "0xff")),
+        ("1200", "04FF0101", ("SOCKET", 4, 255, "NORMAL", "on")),
+        ("0101", "0464557F", ("DOOR_WINDOW_SENSOR", 4, 100, "ALARM", "0x7f")),
+        ("0013", "0105fe00", ("FIRE_ALARM", 1, 5, "fe", "off")),
+        ("0013", "0105FE0", ("FIRE_ALARM", 1, 5, "UNKNOWN", "off")),
+        ("FFFF", "0364AAFF", None),
+    ],
+)
+def test_get_device_state(device_name: str, device_status: str, expected):
+    """Test decoding the status data with the lookup tables."""
+    state = get_device_state(7, device_name, device_status)
+    if expected is None:
+        assert state is None
+        return
+    assert (
+        state.device_type,
+        state.signal,
+        state.battery,
+        state.device_state,
+        state.device_value,
+    ) == expected
+
+
+def test_get_device_state_invalid():
+    """Test invalid status data raises a ValueError."""
+    with pytest.raises(ValueError):
+        get_device_state(7, "0013", "zz64AAFF")
+
+
+def test_device_name_codec():
+    """Test the device name codec round trip and padding."""
+    encoded = encode_device_name("Zolder")
+    assert encoded == get_ascii("Zolder") + crc_maker("Zolder")
+    assert encoded[:32] == "4040404040404040405a6f6c64657224"
+    assert decode_device_name(encoded[:32]) == "Zolder"
+    assert encode_device_name("Zolder") is encoded
+    assert get_device_names(
+        [{"answer_content": "00034040404040404040405a6f6c64657224"}]
+    ) == {3: {"name": "Zolder"}}
+
+    argv = {"device_name": "Zolder"}
+    set_device_name(argv)
+    assert argv["device_name"] == encoded
+
+    with pytest.raises(ValueError):
+        encode_device_name("A name that is too long")
+    with pytest.raises(ValueError):
+        decode_device_name("4040")